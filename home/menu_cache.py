@@ -0,0 +1,215 @@
+import hashlib
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+
+class MenuSnapshot:
+    """
+    Immutable copy of the menu at one version, plus the serialized
+    payloads built from it so far.
+    """
+
+    def __init__(self, version, **data):
+        self.version = version
+        self.__dict__.update(data)
+        self._payloads = {}
+        self._derived = {}
+
+    def derived(self, key, build):
+        """
+        Return an object computed once from this snapshot, e.g. an index.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = build()
+            return value
+
+    def payload(self, key, build):
+        """
+        Return (json_bytes, etag) for ``key``, calling ``build()`` for the
+        data only the first time the key is requested at this version.
+        """
+        cached = self._payloads.get(key)
+        if cached is None:
+            body = JSONRenderer().render(build())
+            cached = (body, json_etag(body))
+            self._payloads[key] = cached
+        return cached
+
+
+# seconds a worker trusts the last version it read before checking again
+VERSION_MAX_AGE = 2
+
+
+class VersionCounter:
+    """
+    Version of a process-local cache, kept in a CacheVersion row.
+
+    bump() increments the row in the caller's transaction, so the new
+    version is visible to every worker exactly when the edit is. version()
+    reads the row at most every ``max_age`` seconds; a bump in this process
+    is seen at once.
+    """
+
+    def __init__(self, name, max_age=VERSION_MAX_AGE):
+        self.name = name
+        self.max_age = max_age
+        self._version = None
+        self._checked_at = None
+
+    def _reset(self):
+        self._checked_at = None
+
+    def version(self):
+        from .models import CacheVersion
+
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.max_age:
+            return self._version
+
+        checked_at = time.monotonic()
+        version = CacheVersion.objects.filter(name=self.name).values_list('version', flat=True).first()
+        if version is None:
+            # start from the clock so a recreated row never reuses a version
+            version = CacheVersion.objects.get_or_create(name=self.name, defaults={'version': time.time_ns()})[0].version
+        self._version, self._checked_at = version, checked_at
+        return version
+
+    def bump(self):
+        """
+        Increment the version; returns (previous, new), or (None, new) if
+        the row was only just created.
+        """
+        from .models import CacheVersion
+
+        versions = CacheVersion.objects.filter(name=self.name)
+        if versions.update(version=F('version') + 1):
+            # the UPDATE holds the row until commit, so nobody bumped in between
+            new = versions.values_list('version', flat=True).get()
+            previous = new - 1
+        else:
+            new = CacheVersion.objects.get_or_create(name=self.name, defaults={'version': time.time_ns()})[0].version
+            previous = None
+        self._reset()
+        # reads in between see the committed version; look again once this commits
+        transaction.on_commit(self._reset)
+        return previous, new
+
+
+class VersionedSnapshotCache:
+    """
+    In-memory menu catalog that is rebuilt only when its version changes.
+
+    The snapshot is per process; its version is a VersionCounter that
+    model signals bump whenever the catalog is edited, so another worker's
+    edit is picked up within VERSION_MAX_AGE seconds.
+    """
+
+    def __init__(self, name, loader, max_age=VERSION_MAX_AGE):
+        self.name = name
+        self.loader = loader
+        self.counter = VersionCounter(name, max_age)
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def version(self):
+        return self.counter.version()
+
+    def bump(self):
+        self.counter.bump()
+        self._snapshot = None
+
+    def get_snapshot(self):
+        version = self.version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = MenuSnapshot(version, **self.loader())
+                    self._snapshot = snapshot
+        return snapshot
+
+
+def load_menu():
+    from orders.models import Ingredient
+    from .models import MenuCategory, MenuItem
+
+    return {
+        'items': list(MenuItem.objects.select_related('category').order_by('id')),
+        'categories': list(MenuCategory.objects.order_by('id')),
+        'ingredients': list(Ingredient.objects.values_list('menu_item_id', 'name')),
+    }
+
+
+def get_search_index(snapshot=None):
+    from .search import MenuSearchIndex
+
+    snapshot = snapshot or menu_snapshots.get_snapshot()
+    return snapshot.derived(
+        'search', lambda: MenuSearchIndex(snapshot.items, snapshot.ingredients)
+    )
+
+
+menu_snapshots = VersionedSnapshotCache('home:menu', load_menu)
+
+
+def get_ingredient_index(snapshot=None):
+    from .search import IngredientIndex
+
+    snapshot = snapshot or menu_snapshots.get_snapshot()
+    return snapshot.derived(
+        'ingredients', lambda: IngredientIndex(snapshot.items, snapshot.ingredients)
+    )
+
+
+def json_etag(body):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def cached_json_response(request, body, etag):
+    """
+    Serve a cached JSON payload with a strong ETag, or 304 if the client
+    already has it.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+class CachedMenuListMixin:
+    """
+    Serve a list endpoint from a menu snapshot instead of the database.
+
+    Subclasses implement get_menu_data(snapshot); get_menu_cache_key() must
+    return a distinct key for every distinct response, or None for responses
+    that are too varied to keep (they are still built from the snapshot).
+    """
+    menu_cache = menu_snapshots
+
+    def get_menu_cache_key(self, snapshot):
+        return self.__class__.__name__
+
+    def get_menu_data(self, snapshot):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        snapshot = self.menu_cache.get_snapshot()
+        key = self.get_menu_cache_key(snapshot)
+        if key is None:
+            body = JSONRenderer().render(self.get_menu_data(snapshot))
+            etag = json_etag(body)
+        else:
+            body, etag = snapshot.payload(key, lambda: self.get_menu_data(snapshot))
+        return cached_json_response(request, body, etag)
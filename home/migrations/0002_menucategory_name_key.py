@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+def fill_name_keys(apps, schema_editor):
+    MenuCategory = apps.get_model('home', 'MenuCategory')
+    categories = list(MenuCategory.objects.all())
+    for category in categories:
+        category.name_key = category.name.strip().casefold()
+    MenuCategory.objects.bulk_update(categories, ['name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menucategory',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
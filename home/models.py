@@ -1,7 +1,18 @@
+from django.conf import settings
 from django.db import models
 
 class MenuCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # case-insensitive lookup key, iexact on name cannot use an index
+    name_key = models.CharField(max_length=100, db_index=True, editable=False, default='')
+
+    def save(self, *args, **kwargs):
+        self.name_key = self.normalize_name(self.name)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def normalize_name(name):
+        return name.strip().casefold()
 
     def __str__(self):
         return self.name
@@ -19,6 +30,65 @@ class Table(models.Model):
     table_number = models.IntegerField()
     capacity = models.IntegerField()
     is_available = models.BooleanField(default=True)
+    occupied_since = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Table {self.table_number}"
+
+class Reservation(models.Model):
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    customer_name = models.CharField(max_length=100)
+    party_size = models.PositiveIntegerField()
+    # half-open interval [starts_at, ends_at)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table', 'starts_at', 'ends_at'], name='reservation_table_time_idx'),
+            models.Index(fields=['starts_at', 'ends_at'], name='reservation_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_name} - Table {self.table.table_number} at {self.starts_at}"
+
+class WaitlistEntry(models.Model):
+    WAITING = 'waiting'
+    SEATED = 'seated'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (WAITING, 'Waiting'),
+        (SEATED, 'Seated'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    customer_name = models.CharField(max_length=100)
+    party_size = models.PositiveIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=WAITING)
+    table = models.ForeignKey(Table, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    seated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='waitlist_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_name} ({self.party_size}) - {self.status}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version of a cache kept in each process (see home.menu_cache). It is
+    bumped in the same transaction as the edit, so every worker sees the
+    change once it commits.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.version}"
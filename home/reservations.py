@@ -0,0 +1,219 @@
+from bisect import bisect_left, bisect_right
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Reservation, Table
+
+
+class AvailabilityIndex:
+    """
+    Reservations of every table inside a time window, kept as per-table
+    sorted arrays of start and end times.
+
+    A table's reservations never overlap, so both arrays are sorted and
+    "is this table free between a and b" is a single bisect. Tables are
+    sorted by capacity, so tables too small for a party are skipped with
+    another bisect.
+    """
+
+    def __init__(self, tables, reservations):
+        self.tables = sorted(tables, key=lambda table: (table.capacity, table.table_number))
+        self.capacities = [table.capacity for table in self.tables]
+        self.starts = {table.id: [] for table in self.tables}
+        self.ends = {table.id: [] for table in self.tables}
+        for table_id, starts_at, ends_at in sorted(reservations, key=lambda row: row[1]):
+            if table_id in self.starts:
+                self.starts[table_id].append(starts_at)
+                self.ends[table_id].append(ends_at)
+
+    @classmethod
+    def load(cls, window_start, window_end):
+        """
+        Build the index for [window_start, window_end) with one query for
+        the tables and one for the reservations overlapping the window.
+        """
+        tables = Table.objects.only('id', 'table_number', 'capacity', 'is_available')
+        reservations = Reservation.objects.filter(
+            starts_at__lt=window_end, ends_at__gt=window_start
+        ).values_list('table_id', 'starts_at', 'ends_at')
+        return cls(list(tables), list(reservations))
+
+    def is_free(self, table_id, start, end):
+        ends = self.ends[table_id]
+        # first reservation that ends after ``start`` must begin at or after ``end``
+        position = bisect_right(ends, start)
+        return position == len(ends) or self.starts[table_id][position] >= end
+
+    def free_tables(self, party_size, start, end):
+        """
+        Tables that seat ``party_size`` and are free for [start, end),
+        smallest first.
+        """
+        first = bisect_left(self.capacities, party_size)
+        return [table for table in self.tables[first:] if self.is_free(table.id, start, end)]
+
+    def slots(self, party_size, window_start, window_end, duration, step):
+        """
+        Free tables for every slot of ``duration`` starting each ``step``
+        inside the window, as a list of (slot start, tables).
+        """
+        slots = []
+        start = window_start
+        while start + duration <= window_end:
+            slots.append((start, self.free_tables(party_size, start, start + duration)))
+            start += step
+        return slots
+
+
+def find_free_tables(party_size, start, end):
+    return AvailabilityIndex.load(start, end).free_tables(party_size, start, end)
+
+
+def _insert_if_free(table_id, party_size, starts_at, ends_at, customer_name, user_id, created_at):
+    """
+    INSERT ... SELECT ... WHERE NOT EXISTS (an overlapping reservation):
+    the overlap check and the insert are one statement.
+
+    :return: True if the reservation was inserted.
+    """
+    opts = Reservation._meta
+    quote = connection.ops.quote_name
+    values = {
+        'table': table_id,
+        'user': user_id,
+        'customer_name': customer_name,
+        'party_size': party_size,
+        'starts_at': starts_at,
+        'ends_at': ends_at,
+        'created_at': created_at,
+    }
+    fields = [opts.get_field(name) for name in values]
+    params = [field.get_db_prep_save(values[field.name], connection) for field in fields]
+    column = lambda name: quote(opts.get_field(name).column)
+
+    sql = (
+        f"INSERT INTO {quote(opts.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+        f"SELECT {', '.join(['%s'] * len(fields))}{connection.features.bare_select_suffix} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {quote(opts.db_table)} "
+        f"WHERE {column('table')} = %s AND {column('starts_at')} < %s AND {column('ends_at')} > %s)"
+    )
+    # overlap with [starts_at, ends_at): starts before it ends and ends after it starts
+    params += [table_id, params[fields.index(opts.get_field('ends_at'))],
+               params[fields.index(opts.get_field('starts_at'))]]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def book_table(table_id, party_size, starts_at, ends_at, customer_name, user=None):
+    """
+    Reserve a table for [starts_at, ends_at).
+
+    The table row is locked and the reservation is written with a
+    conditional insert, so two concurrent bookings of overlapping times
+    cannot both succeed.
+
+    :raises Table.DoesNotExist: if there is no such table.
+    :raises ValidationError: if the times or party size are invalid or
+        the table is already booked for part of that time.
+    """
+    if ends_at <= starts_at:
+        raise ValidationError("A reservation must end after it starts.")
+    if party_size < 1:
+        raise ValidationError("Party size must be at least 1.")
+
+    with transaction.atomic():
+        table = Table.objects.select_for_update().get(pk=table_id)
+        if party_size > table.capacity:
+            raise ValidationError(f"Table {table.table_number} only accommodates {table.capacity} people.")
+
+        inserted = _insert_if_free(
+            table.pk, party_size, starts_at, ends_at, customer_name,
+            user.pk if user is not None else None, timezone.now()
+        )
+        if not inserted:
+            raise ValidationError(f"Table {table.table_number} is already booked for that time.")
+
+        return Reservation.objects.get(table=table, starts_at=starts_at, ends_at=ends_at)
+
+
+# ---------------------------
+# SEATING
+# ---------------------------
+# most tables pushed together for one party
+MAX_COMBINED_TABLES = 3
+
+
+def occupancy_summary():
+    """
+    Table and seat counts, occupied and free, from one aggregate query.
+    """
+    free = Q(is_available=True)
+    summary = Table.objects.aggregate(
+        total_tables=Count('id'),
+        available_count=Count('id', filter=free),
+        total_seats=Coalesce(Sum('capacity'), 0),
+        available_seats=Coalesce(Sum('capacity', filter=free), 0),
+    )
+    summary['occupied_count'] = summary['total_tables'] - summary['available_count']
+    summary['occupied_seats'] = summary['total_seats'] - summary['available_seats']
+    return summary
+
+
+def best_fit_tables(tables, party_size, max_tables=MAX_COMBINED_TABLES):
+    """
+    Pick the free tables to seat ``party_size``.
+
+    The smallest single table that fits wins (found by bisecting the
+    capacities). Failing that, a subset-sum pass over the capacities finds
+    the combination of at most ``max_tables`` tables with the fewest spare
+    seats, then the fewest tables. Only ``max_tables`` tables of each
+    capacity can matter, so the pass stays small in large venues.
+
+    :return: list of tables, or [] if the party cannot be seated.
+    """
+    tables = sorted(tables, key=lambda table: (table.capacity, table.table_number))
+    capacities = [table.capacity for table in tables]
+    position = bisect_left(capacities, party_size)
+    if position < len(tables):
+        return [tables[position]]
+
+    candidates = []
+    per_capacity = {}
+    for table in tables:
+        if table.capacity > 0 and per_capacity.get(table.capacity, 0) < max_tables:
+            per_capacity[table.capacity] = per_capacity.get(table.capacity, 0) + 1
+            candidates.append(table)
+
+    # best[seats] = the fewest tables found that add up to exactly ``seats``
+    best = {0: ()}
+    for index, table in enumerate(candidates):
+        for seats, combination in list(best.items()):
+            if len(combination) == max_tables or seats >= party_size:
+                continue
+            total = seats + table.capacity
+            if total not in best or len(best[total]) > len(combination) + 1:
+                best[total] = combination + (index,)
+
+    fits = [seats for seats in best if seats >= party_size]
+    if not fits:
+        return []
+    seats = min(fits, key=lambda seats: (seats, len(best[seats])))
+    return [candidates[index] for index in best[seats]]
+
+
+def suggest_tables(party_size, start=None, end=None):
+    """
+    Best-fitting table(s) for a party: free right now, or free for
+    [start, end) when a time is given.
+    """
+    if start is None:
+        tables = Table.objects.filter(is_available=True).only('id', 'table_number', 'capacity', 'is_available')
+    else:
+        index = AvailabilityIndex.load(start, end)
+        tables = [table for table in index.tables if index.is_free(table.id, start, end)]
+    return best_fit_tables(list(tables), party_size)
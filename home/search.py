@@ -0,0 +1,247 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+WORD_RE = re.compile(r'\w+')
+
+# how much a match in each field counts towards an item's score
+NAME_WEIGHT = 3.0
+INGREDIENT_WEIGHT = 1.5
+CATEGORY_WEIGHT = 1.0
+
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+FUZZY_MATCH = 0.6
+
+MIN_SIMILARITY = 0.4
+MAX_EXPANSIONS = 50
+
+# resolved include/exclude terms kept per ingredient index
+TERM_CACHE_SIZE = 256
+
+
+def normalize(text):
+    """
+    Lower-case, accent-free words of ``text``.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return WORD_RE.findall(text)
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuSearchIndex:
+    """
+    In-memory inverted index over menu item names, categories and
+    ingredient names with prefix and trigram (typo tolerant) lookups.
+
+    Built once per menu snapshot; queries only touch the postings of the
+    words they match, so they stay fast on large catalogs.
+    """
+
+    def __init__(self, items, ingredients=()):
+        self.items = list(items)
+        postings = defaultdict(dict)
+
+        def add(text, position, weight):
+            for word in normalize(text):
+                if postings[word].get(position, 0) < weight:
+                    postings[word][position] = weight
+
+        position_of = {}
+        for position, item in enumerate(self.items):
+            position_of[item.id] = position
+            add(item.name, position, NAME_WEIGHT)
+            add(item.category.name, position, CATEGORY_WEIGHT)
+        for menu_item_id, name in ingredients:
+            if menu_item_id in position_of:
+                add(name, position_of[menu_item_id], INGREDIENT_WEIGHT)
+
+        self.postings = dict(postings)
+        # ties are broken by name; precomputing the order keeps sorting cheap
+        self.name_rank = [0] * len(self.items)
+        by_name = sorted(range(len(self.items)), key=lambda position: self.items[position].name)
+        for rank, position in enumerate(by_name):
+            self.name_rank[position] = rank
+        self.words = sorted(self.postings)
+        self.trigram_words = defaultdict(list)
+        for word in self.words:
+            for gram in trigrams(word):
+                self.trigram_words[gram].append(word)
+
+    def prefix_words(self, prefix, limit=MAX_EXPANSIONS):
+        start = bisect_left(self.words, prefix)
+        matches = []
+        for word in self.words[start:start + limit]:
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+        return matches
+
+    def similar_words(self, token):
+        grams = trigrams(token)
+        shared = Counter(word for gram in grams for word in self.trigram_words.get(gram, ()))
+        similar = []
+        for word, common in shared.most_common(MAX_EXPANSIONS * 4):
+            similarity = common / (len(grams) + len(trigrams(word)) - common)
+            if similarity >= MIN_SIMILARITY:
+                similar.append((word, similarity))
+        similar.sort(key=lambda pair: -pair[1])
+        return similar[:MAX_EXPANSIONS]
+
+    def expand(self, token):
+        """
+        Index words matching ``token`` with their match quality.
+        """
+        matches = {}
+        for word in self.prefix_words(token):
+            matches[word] = EXACT_MATCH if word == token else PREFIX_MATCH
+        if len(token) >= 3:
+            for word, similarity in self.similar_words(token):
+                matches.setdefault(word, FUZZY_MATCH * similarity)
+        return matches
+
+    def search(self, query, limit=None):
+        """
+        Menu items matching every word of ``query``, best matches first.
+        """
+        tokens = normalize(query)
+        if not tokens:
+            return []
+
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for word, quality in self.expand(token).items():
+                for position, weight in self.postings[word].items():
+                    score = quality * weight
+                    if score > token_scores.get(position, 0):
+                        token_scores[position] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    position: score + token_scores[position]
+                    for position, score in scores.items() if position in token_scores
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], self.name_rank[position]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.items[position] for position in ranked]
+
+    def autocomplete(self, prefix, limit=10):
+        """
+        Menu item names for search-as-you-type; the last word may be partial.
+        """
+        tokens = normalize(prefix)
+        if not tokens:
+            return []
+        *complete, partial = tokens
+        positions = None
+        for token in complete:
+            found = set(self.postings.get(token, ()))
+            positions = found if positions is None else positions & found
+        candidates = {}
+        for word in self.prefix_words(partial):
+            for position, weight in self.postings[word].items():
+                if positions is None or position in positions:
+                    candidates[position] = max(candidates.get(position, 0), weight)
+        ranked = sorted(candidates, key=lambda position: (-candidates[position], self.name_rank[position]))
+        names = []
+        for position in ranked:
+            name = self.items[position].name
+            if name not in names:
+                names.append(name)
+            if len(names) == limit:
+                break
+        return names
+
+
+def stem(word):
+    """
+    Crude singular of an English word, so "peanuts" and "tomatoes" meet
+    "peanut" and "tomato".
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+class IngredientIndex:
+    """
+    Per-ingredient bitsets over menu item positions, for include/exclude
+    ingredient filters (e.g. "no peanuts, no dairy").
+
+    Bit ``n`` of an ingredient's bitset is set when the ``n``-th menu item
+    contains it, so a filter is a handful of big-integer AND/NOT operations
+    instead of a scan over the ingredient rows. Resolved terms are kept in
+    a bounded LRU cache.
+    """
+
+    def __init__(self, items, ingredients=(), term_cache_size=TERM_CACHE_SIZE):
+        self.items = list(items)
+        position_of = {item.id: position for position, item in enumerate(self.items)}
+        self.all_items = (1 << len(self.items)) - 1
+
+        bitsets = defaultdict(int)
+        for menu_item_id, name in ingredients:
+            if menu_item_id in position_of:
+                bitsets[tuple(stem(word) for word in normalize(name))] |= 1 << position_of[menu_item_id]
+        self.bitsets = dict(bitsets)
+        self._term_bits = lru_cache(maxsize=term_cache_size)(self._match_bits)
+
+    def _match_bits(self, words, anywhere):
+        bits = 0
+        for name, bitset in self.bitsets.items():
+            if anywhere:
+                found = all(any(word in part for part in name) for word in words)
+            else:
+                found = all(any(part.startswith(word) for part in name) for word in words)
+            if found:
+                bits |= bitset
+        return bits
+
+    def term_bits(self, term, anywhere=False):
+        """
+        Items with an ingredient that matches every word of ``term``, after
+        both are singularised: each word must start a word of the name, or
+        with ``anywhere`` appear anywhere in one ("nut" in "Hazelnut").
+        """
+        words = tuple(stem(word) for word in normalize(term))
+        if not words:
+            return 0
+        return self._term_bits(words, anywhere)
+
+    def filter(self, include=(), exclude=()):
+        """
+        Menu items containing every ``include`` ingredient and none of the
+        ``exclude`` ones, in menu order. Exclusions also match inside words,
+        so "nut" drops "Hazelnut" and "Peanut Butter".
+        """
+        mask = self.all_items
+        for term in include:
+            mask &= self.term_bits(term)
+        for term in exclude:
+            # an allergen filter: rather drop an item too many than serve it
+            mask &= ~self.term_bits(term, anywhere=True)
+
+        bits = bin(mask)[:1:-1]
+        items = []
+        position = bits.find('1')
+        while position != -1:
+            items.append(self.items[position])
+            position = bits.find('1', position + 1)
+        return items
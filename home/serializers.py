@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import MenuCategory, MenuItem, Table
+from .models import MenuCategory, MenuItem, Reservation, Table, WaitlistEntry
+from .reservations import book_table
+from .waitlist import join_waitlist
 
 class MenuCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,3 +20,59 @@ class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = '__all__'
+
+class ReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reservation
+        fields = ['id', 'table', 'customer_name', 'party_size', 'starts_at', 'ends_at', 'created_at']
+        read_only_fields = ['created_at']
+
+    def create(self, validated_data):
+        try:
+            return book_table(
+                validated_data['table'].pk,
+                validated_data['party_size'],
+                validated_data['starts_at'],
+                validated_data['ends_at'],
+                validated_data['customer_name'],
+                user=validated_data.get('user')
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'non_field_errors': e.messages})
+
+class TableAvailabilitySerializer(serializers.Serializer):
+    party_size = serializers.IntegerField(min_value=1)
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    # optional: split [start, end) into slots of this many minutes
+    duration = serializers.IntegerField(min_value=15, max_value=24 * 60, required=False)
+    step = serializers.IntegerField(min_value=5, max_value=24 * 60, default=30)
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError("end must be after start.")
+        if data['end'] - data['start'] > timedelta(days=1):
+            raise serializers.ValidationError("The availability window is limited to one day.")
+        return data
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True)
+    estimated_wait_minutes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'customer_name', 'party_size', 'status', 'created_at', 'position', 'estimated_wait_minutes']
+        read_only_fields = ['status', 'created_at']
+        extra_kwargs = {'party_size': {'min_value': 1}}
+
+    def create(self, validated_data):
+        try:
+            return join_waitlist(
+                validated_data['customer_name'], validated_data['party_size'], user=validated_data.get('user')
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'party_size': e.messages})
+
+    def get_estimated_wait_minutes(self, obj):
+        wait = getattr(obj, 'estimated_wait', None)
+        return None if wait is None else int(wait.total_seconds() // 60)
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .menu_cache import menu_snapshots
+from .models import MenuCategory, MenuItem, Table
+from .waitlist import turnover_stats
+
+
+# ---------------------------
+# MENU CACHE
+# ---------------------------
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=MenuCategory)
+@receiver(post_delete, sender=MenuCategory)
+def bump_menu_version(sender, **kwargs):
+    menu_snapshots.bump()
+
+
+# ---------------------------
+# WAITLIST (table capacities)
+# ---------------------------
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def reload_table_capacities(sender, **kwargs):
+    turnover_stats.tables_changed()
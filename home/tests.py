@@ -0,0 +1,294 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import Ingredient
+from .menu_cache import VersionedSnapshotCache, load_menu
+from .models import CacheVersion, MenuCategory, MenuItem, Reservation, Table, WaitlistEntry
+from .reservations import AvailabilityIndex, best_fit_tables, book_table, occupancy_summary
+from .waitlist import (
+    join_waitlist, release_and_promote, seat_table, turnover_stats, waitlist_position, waitlist_with_estimates
+)
+
+
+class MenuCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.drinks = MenuCategory.objects.create(name='Drinks')
+        self.coffee = MenuItem.objects.create(name='Coffee', category=self.drinks, price='50.00', is_featured=True)
+        MenuItem.objects.create(name='Juice', category=self.drinks, price='60.00')
+
+    def test_menu_is_served_from_cache_with_etag(self):
+        """Test menu endpoints skip the database and honour If-None-Match"""
+        response = self.client.get('/menu/featured-items/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.json()], ['Coffee'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/menu/featured-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.coffee.is_featured = False
+        self.coffee.save()
+        response = self.client.get('/menu/featured-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_version_is_read_from_the_database(self):
+        """Test a version bumped by another worker invalidates this worker's snapshot"""
+        snapshots = VersionedSnapshotCache('test:menu', load_menu, max_age=0)
+        first = snapshots.get_snapshot()
+        self.assertIs(snapshots.get_snapshot(), first)
+
+        # another worker's edit: the row changes, this process gets no signal
+        MenuItem.objects.filter(pk=self.coffee.pk).update(name='Espresso')
+        CacheVersion.objects.filter(name='test:menu').update(version=F('version') + 1)
+        self.assertIn('Espresso', [item.name for item in snapshots.get_snapshot().items])
+
+    def test_items_by_category_is_case_insensitive(self):
+        """Test the per-category menu matches category names case-insensitively"""
+        response = self.client.get('/menu/items/', {'category': 'DRINKS'})
+        self.assertEqual(len(response.json()), 2)
+
+        response = self.client.get('/menu/items/', {'category': 'Desserts'})
+        self.assertEqual(response.json(), [])
+
+    def test_grouped_menu_has_counts_and_price_ranges(self):
+        """Test the grouped menu returns every category with its items"""
+        MenuCategory.objects.create(name='Desserts')
+
+        response = self.client.get('/menu/grouped/')
+        groups = {group['name']: group for group in response.json()}
+        self.assertEqual(groups['Drinks']['item_count'], 2)
+        self.assertEqual((groups['Drinks']['min_price'], groups['Drinks']['max_price']), ('50.00', '60.00'))
+        self.assertEqual([item['name'] for item in groups['Drinks']['items']], ['Coffee', 'Juice'])
+        self.assertEqual(groups['Desserts']['items'], [])
+
+
+class MenuSearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        mains = MenuCategory.objects.create(name='Main Course')
+        desserts = MenuCategory.objects.create(name='Desserts')
+        self.chicken = MenuItem.objects.create(name='Grilled Chicken', category=mains, price='250.00')
+        self.masala = MenuItem.objects.create(name='Paneer Butter Masala', category=mains, price='220.00')
+        MenuItem.objects.create(name='Chocolate Brownie', category=desserts, price='100.00')
+        Ingredient.objects.create(name='Chicken Breast', menu_item=self.chicken)
+        Ingredient.objects.create(name='Butter', menu_item=self.masala)
+
+    def search(self, query):
+        response = self.client.get('/menu/items/search/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+
+    def test_search_ranks_prefix_and_typo_matches(self):
+        """Test search matches prefixes, typos and ingredients, name matches first"""
+        self.assertEqual(self.search('chick'), ['Grilled Chicken'])
+        self.assertEqual(self.search('choclate'), ['Chocolate Brownie'])
+        self.assertEqual(self.search('butter'), ['Paneer Butter Masala'])
+        self.assertEqual(self.search('dessert'), ['Chocolate Brownie'])
+        self.assertEqual(self.search(''), [])
+
+        Ingredient.objects.create(name='Butter', menu_item=self.chicken)
+        self.assertEqual(self.search('butter'), ['Paneer Butter Masala', 'Grilled Chicken'])
+
+    def test_autocomplete_completes_last_word(self):
+        """Test autocomplete suggests item names for a partial word"""
+        response = self.client.get('/menu/items/autocomplete/', {'q': 'paneer but'})
+        self.assertEqual(response.data['suggestions'], ['Paneer Butter Masala'])
+
+    def test_menu_filters_by_ingredients(self):
+        """Test include/exclude ingredient filters on the menu and their refresh"""
+        def names(**params):
+            return [item['name'] for item in self.client.get('/menu/items/', params).json()]
+
+        self.assertEqual(names(include='butter'), ['Paneer Butter Masala'])
+        self.assertEqual(names(exclude='chicken, butter'), ['Chocolate Brownie'])
+        self.assertEqual(names(exclude='chicken', category='main course'), ['Paneer Butter Masala'])
+
+        Ingredient.objects.create(name='Peanut Butter', menu_item=self.chicken)
+        self.assertEqual(names(include='butter'), ['Grilled Chicken', 'Paneer Butter Masala'])
+        self.assertEqual(names(include='peanut butter'), ['Grilled Chicken'])
+
+        # exclusions match plurals and compounds
+        Ingredient.objects.create(name='Hazelnut', menu_item=MenuItem.objects.get(name='Chocolate Brownie'))
+        self.assertEqual(names(exclude='peanuts'), ['Paneer Butter Masala', 'Chocolate Brownie'])
+        self.assertEqual(names(exclude='nut'), ['Paneer Butter Masala'])
+
+
+class ReservationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='guest', password='testpass123')
+        self.two = Table.objects.create(table_number=1, capacity=2)
+        self.four = Table.objects.create(table_number=2, capacity=4)
+        self.six = Table.objects.create(table_number=3, capacity=6)
+        self.evening = timezone.now().replace(hour=19, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def at(self, hours):
+        return self.evening + timedelta(hours=hours)
+
+    def test_overlapping_bookings_are_refused(self):
+        """Test a table cannot be booked twice for overlapping times"""
+        book_table(self.four.id, 4, self.at(0), self.at(2), 'First')
+
+        with self.assertRaises(ValidationError):
+            book_table(self.four.id, 2, self.at(1), self.at(3), 'Second')
+        with self.assertRaises(ValidationError):
+            book_table(self.two.id, 3, self.at(0), self.at(2), 'Too Many')
+
+        book_table(self.four.id, 2, self.at(2), self.at(4), 'Back To Back')
+        self.assertEqual(Reservation.objects.filter(table=self.four).count(), 2)
+
+    def test_availability_for_an_evening(self):
+        """Test free tables per slot come from one index built with two queries"""
+        book_table(self.four.id, 4, self.at(0), self.at(2), 'Booked')
+
+        with self.assertNumQueries(2):
+            index = AvailabilityIndex.load(self.at(0), self.at(4))
+        slots = index.slots(3, self.at(0), self.at(4), timedelta(hours=2), timedelta(hours=1))
+        self.assertEqual(
+            [[table.table_number for table in tables] for start, tables in slots],
+            [[3], [3], [2, 3]]
+        )
+
+    def test_reservation_api(self):
+        """Test booking through the API and searching availability"""
+        self.client.login(username='guest', password='testpass123')
+        booking = {'table': self.two.id, 'customer_name': 'Guest', 'party_size': 2,
+                   'starts_at': self.at(0).isoformat(), 'ends_at': self.at(2).isoformat()}
+
+        response = self.client.post('/api/reservations/', booking)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/api/reservations/', booking)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(self.client.get('/api/reservations/').json()), 1)
+
+        response = self.client.get('/api/tables/availability/', {
+            'party_size': 2, 'start': self.at(1).isoformat(), 'end': self.at(2).isoformat()
+        })
+        self.assertEqual([table['table_number'] for table in response.json()['tables']], [2, 3])
+
+
+class TableAssignmentTestCase(APITestCase):
+    def setUp(self):
+        capacities = [2, 2, 4, 4, 6]
+        self.tables = [Table.objects.create(table_number=i + 1, capacity=c) for i, c in enumerate(capacities)]
+
+    def test_occupancy_summary_is_one_query(self):
+        """Test table and seat counts come from a single aggregate"""
+        Table.objects.filter(capacity=4).update(is_available=False)
+        with self.assertNumQueries(1):
+            summary = occupancy_summary()
+        self.assertEqual(
+            (summary['total_tables'], summary['available_count'], summary['occupied_count'],
+             summary['total_seats'], summary['available_seats']),
+            (5, 3, 2, 18, 10)
+        )
+
+    def test_best_fit_prefers_smallest_table_then_combinations(self):
+        """Test couples get two-tops and large parties get the tightest combination"""
+        def numbers(party_size, tables=self.tables):
+            return sorted(table.table_number for table in best_fit_tables(tables, party_size))
+
+        self.assertEqual(numbers(2), [1])
+        self.assertEqual(numbers(3), [3])
+        self.assertEqual(numbers(8), [3, 4])
+        self.assertEqual(numbers(10), [3, 5])
+        self.assertEqual(numbers(17), [])
+
+    def test_assignment_api_uses_free_tables(self):
+        """Test the suggestion skips occupied tables"""
+        Table.objects.filter(table_number=3).update(is_available=False)
+        response = self.client.get('/api/tables/assign/', {'party_size': 3})
+        self.assertEqual([table['table_number'] for table in response.json()['tables']], [4])
+        self.assertEqual(response.json()['spare_seats'], 1)
+
+        response = self.client.get('/api/tables/assign/', {'party_size': 40})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class WaitlistTestCase(APITestCase):
+    def setUp(self):
+        turnover_stats.reset()
+        self.two = Table.objects.create(table_number=1, capacity=2)
+        self.four = Table.objects.create(table_number=2, capacity=4)
+        self.now = timezone.now()
+
+    def test_release_promotes_next_party_that_fits(self):
+        """Test a released table seats the longest-waiting party it can hold"""
+        with self.captureOnCommitCallbacks(execute=True):
+            seat_table(self.four, self.now - timedelta(minutes=90))
+        big = WaitlistEntry.objects.create(customer_name='Big', party_size=6)
+        pair = WaitlistEntry.objects.create(customer_name='Pair', party_size=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promoted = release_and_promote(self.four, self.now)
+
+        self.assertEqual(promoted, pair)
+        pair.refresh_from_db()
+        self.four.refresh_from_db()
+        self.assertEqual((pair.status, pair.table), (WaitlistEntry.SEATED, self.four))
+        self.assertEqual((self.four.is_available, self.four.occupied_since), (False, self.now))
+        big.refresh_from_db()
+        self.assertEqual(big.status, WaitlistEntry.WAITING)
+
+    def test_estimates_follow_turnover(self):
+        """Test wait estimates use the rolling turnover of suitable tables"""
+        with self.captureOnCommitCallbacks(execute=True):
+            seat_table(self.two, self.now - timedelta(minutes=30))
+            seat_table(self.four, self.now - timedelta(minutes=50))
+
+        # default turnover of an hour: the four-top frees in 10 minutes, the two-top in 30
+        self.assertEqual(turnover_stats.estimate_wait(2, 1, self.now), timedelta(minutes=10))
+        self.assertEqual(turnover_stats.estimate_wait(2, 2, self.now), timedelta(minutes=30))
+        self.assertEqual(turnover_stats.estimate_wait(3, 1, self.now), timedelta(minutes=10))
+        self.assertEqual(turnover_stats.estimate_wait(3, 2, self.now), timedelta(minutes=70))
+
+        # a 160 minute stay moves the two-top average by a fifth of the difference
+        with self.captureOnCommitCallbacks(execute=True):
+            release_and_promote(self.two, self.now + timedelta(minutes=130))
+        self.assertEqual(turnover_stats.average_turnover(2), timedelta(minutes=80))
+
+        WaitlistEntry.objects.create(customer_name='Walk-in', party_size=3)
+        response = self.client.post('/api/waitlist/', {'customer_name': 'Next', 'party_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['position'], 2)
+
+        # the list names every waiting party, so only staff see it
+        self.assertEqual(self.client.get('/api/waitlist/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(username='host', password='testpass123', is_staff=True))
+        response = self.client.get('/api/waitlist/')
+        self.assertEqual([(entry['customer_name'], entry['position']) for entry in response.json()],
+                         [('Walk-in', 1), ('Next', 2)])
+
+    def test_positions_count_every_party_competing_for_the_tables(self):
+        """Test smaller parties ahead count towards the queue and oversized parties are turned away"""
+        with self.captureOnCommitCallbacks(execute=True):
+            seat_table(self.two, self.now - timedelta(minutes=30))
+            seat_table(self.four, self.now - timedelta(minutes=50))
+        for name in ('A', 'B', 'C'):
+            join_waitlist(name, 2)
+        trio = join_waitlist('Trio', 3)
+
+        # any of the pairs can take the four-top when it frees
+        self.assertEqual(waitlist_position(trio), 4)
+        entries = waitlist_with_estimates(self.now)
+        self.assertEqual([(entry.position, entry.estimated_wait) for entry in entries], [
+            (1, timedelta(minutes=10)), (2, timedelta(minutes=30)), (3, timedelta(minutes=90)),
+            (4, timedelta(minutes=190)),
+        ])
+
+        self.assertIsNone(turnover_stats.estimate_wait(20, 1, self.now))
+        with self.assertRaises(ValidationError):
+            join_waitlist('Coach party', 20)
+        response = self.client.post('/api/waitlist/', {'customer_name': 'Coach party', 'party_size': 20})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -4,8 +4,14 @@ from .views import (
     FeaturedMenuItemView,
     MenuItemSearchViewSet,
     MenuItemViewSet,
+    MenuItemByCategoryView,
+    MenuGroupedView,
     TableDetailView,
     AvailableTablesAPIView,
+    TableAvailabilitySearchView,
+    TableAssignmentView,
+    ReservationListCreateView,
+    WaitlistView,
     home_page,
     menu_page,
     order_page,
@@ -23,6 +29,7 @@ from .views import (
 
 # for viewSet List endpoint
 menu_item_search = MenuItemSearchViewSet.as_view({'get': 'list'})
+menu_item_autocomplete = MenuItemSearchViewSet.as_view({'get': 'autocomplete'})
 menu_item_update = MenuItemViewSet.as_view({
     'put': 'update',
 })
@@ -41,10 +48,17 @@ urlpatterns = [
 
     path('menu/categories/', MenuCategoryListView.as_view(), name='menu_categories'),
     path('menu/featured-items/', FeaturedMenuItemView.as_view(), name='featured_menu_item'),
+    path('menu/items/', MenuItemByCategoryView.as_view(), name='menu_items_by_category'),
+    path('menu/grouped/', MenuGroupedView.as_view(), name='menu_grouped'),
     path("menu/items/search/", menu_item_search, name="menu_item_search"),
+    path("menu/items/autocomplete/", menu_item_autocomplete, name="menu_item_autocomplete"),
     path("menu-items/<int:pk>/update", menu_item_update, name="menu_item_update"),
     path("tables/<int:pk>/", TableDetailView.as_view(), name="table_detail"),
     path('api/tables/available/', AvailableTablesAPIView.as_view(), name='available_tables_api'),
+    path('api/tables/availability/', TableAvailabilitySearchView.as_view(), name='table_availability_api'),
+    path('api/tables/assign/', TableAssignmentView.as_view(), name='table_assignment_api'),
+    path('api/reservations/', ReservationListCreateView.as_view(), name='reservations_api'),
+    path('api/waitlist/', WaitlistView.as_view(), name='waitlist_api'),
 
     # Table management
     path('tables/', table_availability, name='table_availability'),
@@ -3,18 +3,30 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
 from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from home.models import MenuItem
 from orders.models import Order, OrderItem
+from orders.registry import active_payment_methods, get_order_status, get_payment_method
+from orders.services import place_order
 
 # Create your views here.
 
-from rest_framework.generics import ListAPIView, RetrieveAPIView
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveAPIView
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
-from .models import MenuCategory, MenuItem, Table
-from .serializers import MenuCategorySerializer, MenuItemSerializer, TableSerializer
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
+from .models import MenuCategory, MenuItem, Reservation, Table
+from .reservations import AvailabilityIndex, book_table, occupancy_summary, suggest_tables
+from .waitlist import join_waitlist, release_and_promote, seat_table, turnover_stats, waitlist_position, waitlist_with_estimates
+from .serializers import MenuCategorySerializer, MenuItemSerializer, ReservationSerializer, TableAvailabilitySerializer, TableSerializer, WaitlistEntrySerializer
+from .menu_cache import CachedMenuListMixin, get_ingredient_index, get_search_index, menu_snapshots
 
 # ---------------------------
 # HOME + MENU
@@ -23,7 +35,7 @@ def home_page(request):
     return render(request, 'home.html')
 
 def menu_page(request):
-    items = MenuItem.objects.all()
+    items = menu_snapshots.get_snapshot().items
     return render(request, 'menu.html', {"items": items})
 
 # ---------------------------
@@ -32,8 +44,7 @@ def menu_page(request):
 @login_required
 def order_page(request):
     items = MenuItem.objects.all()
-    from orders.models import PaymentMethod
-    payment_methods = PaymentMethod.objects.filter(is_active=True)
+    payment_methods = active_payment_methods()
 
     if request.method == "POST":
         customer_name = request.POST.get("customer_name")
@@ -48,39 +59,25 @@ def order_page(request):
             messages.error(request, "Please select a payment method.")
             return redirect("/order/")
 
-        order_items_data = []
-
-        for item_id in selected_items:
-            qty = int(request.POST.get(f"qty_{item_id}", 0))
-            if qty <= 0:
-                continue
+        payment_method = get_payment_method(payment_method_id)
+        if payment_method is None:
+            messages.error(request, "Please select a valid payment method.")
+            return redirect("/order/")
 
-            item = MenuItem.objects.get(id=item_id)
-            order_items_data.append((item, qty))
+        quantities = {
+            item_id: request.POST.get(f"qty_{item_id}", 0)
+            for item_id in selected_items
+        }
 
-        if not order_items_data:
+        try:
+            place_order(request.user, customer_name, quantities)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect("/order/")
+        except ValueError:
             messages.error(request, "Please select valid quantities for items.")
             return redirect("/order/")
 
-        #  Save user = logged in user with default status
-        from orders.models import OrderStatus
-        pending_status = OrderStatus.objects.get(name='pending')
-        payment_method = PaymentMethod.objects.get(id=payment_method_id)
-
-        order = Order.objects.create(
-            user=request.user,
-            customer_name=customer_name,
-            status=pending_status
-        )
-
-        for item, qty in order_items_data:
-            OrderItem.objects.create(
-                order=order,
-                menu_item=item,
-                quantity=qty,
-                price=item.price
-            )
-
         messages.success(request, f"Order placed successfully! Payment method: {payment_method.name}")
         return redirect("/my-orders/")
 
@@ -108,13 +105,12 @@ def my_orders(request):
 # ---------------------------
 @login_required
 def cancel_order(request, order_id):
-    from orders.models import OrderStatus
     try:
         order = Order.objects.get(id=order_id, user=request.user)
     except Order.DoesNotExist:
         return redirect("/my-orders/")
 
-    cancelled_status = OrderStatus.objects.get(name='cancelled')
+    cancelled_status = get_order_status('cancelled')
     order.status = cancelled_status
     order.save()
     return redirect("/my-orders/")
@@ -125,11 +121,10 @@ def cancel_order(request, order_id):
 # ---------------------------
 @login_required
 def complete_order(request, order_id):
-    from orders.models import OrderStatus
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(Order.objects.select_related('status'), id=order_id, user=request.user)
     # we allow completing only if not cancelled
     if order.status and order.status.name != 'cancelled':
-        completed_status = OrderStatus.objects.get(name='completed')
+        completed_status = get_order_status('completed')
         order.status = completed_status
         order.save()
     return redirect('my_orders')
@@ -178,16 +173,17 @@ def edit_order(request, order_id):
             order_items_data.append((item, qty))
 
         if order_items_data:
-            # delete previous items then recreate
-            order.orderitem_set.all().delete()
-            for item, qty in order_items_data:
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=item,
-                    quantity=qty,
-                    price=item.price
-                )
-            order.save()
+            # delete previous items then recreate; lines and stock change together
+            with transaction.atomic():
+                order.orderitem_set.all().delete()
+                for item, qty in order_items_data:
+                    OrderItem.objects.create(
+                        order=order,
+                        menu_item=item,
+                        quantity=qty,
+                        price=item.price
+                    )
+                order.save()
         return redirect('my_orders')
 
     # build a map of existing quantities for template pre-fill
@@ -207,17 +203,24 @@ def invoice_page(request, order_id):
     return render(request, "invoice.html", {"order": order})
 
 
-class MenuCategoryListView(ListAPIView):
+class MenuCategoryListView(CachedMenuListMixin, ListAPIView):
     queryset = MenuCategory.objects.all()
     serializer_class = MenuCategorySerializer
 
-class FeaturedMenuItemView(ListAPIView):
+    def get_menu_data(self, snapshot):
+        return self.get_serializer(snapshot.categories, many=True).data
+
+class FeaturedMenuItemView(CachedMenuListMixin, ListAPIView):
     """
     API endpoint to list only the menu items
     """
     queryset = MenuItem.objects.filter(is_featured=True)
     serializer_class = MenuItemSerializer
 
+    def get_menu_data(self, snapshot):
+        items = [item for item in snapshot.items if item.is_featured]
+        return self.get_serializer(items, many=True).data
+
 class MenuItemPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
@@ -229,31 +232,103 @@ class MenuItemSearchViewSet(viewsets.ViewSet):
     def list(self, request):
         search_query = request.GET.get('q', '')
 
-        #search by name
-        queryset = MenuItem.objects.filter(name__icontains=search_query)
+        # ranked search over names, categories and ingredients (empty query -> no results)
+        results = get_search_index().search(search_query)
 
         #paginate results
         paginator = self.pagination_class()
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
+        paginated_queryset = paginator.paginate_queryset(results, request)
 
         serializer = MenuItemSerializer(paginated_queryset, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+    def autocomplete(self, request):
+        prefix = request.GET.get('q', '')
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        return Response({"suggestions": get_search_index().autocomplete(prefix, limit)})
+
 class MenuItemViewSet(viewsets.ModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
 
-class MenuItemByCategoryView(ListAPIView):
+class MenuItemByCategoryView(CachedMenuListMixin, ListAPIView):
     serializer_class = MenuItemSerializer
 
     def get_queryset(self):
         category_name = self.request.query_params.get('category', None)
 
         if category_name:
-            return MenuItem.objects.filter(category__name__iexact=category_name)
+            return MenuItem.objects.filter(category__name_key=MenuCategory.normalize_name(category_name))
 
         return MenuItem.objects.all()
 
+    def get_category_id(self, snapshot):
+        category_name = self.request.query_params.get('category', None)
+        if not category_name:
+            return None
+        name_key = MenuCategory.normalize_name(category_name)
+        for category in snapshot.categories:
+            if category.name_key == name_key:
+                return category.id
+        return 0
+
+    def get_ingredient_filters(self):
+        """
+        ?include=cheese,tomato&exclude=peanut,milk
+        """
+        def terms(param):
+            value = self.request.query_params.get(param, '')
+            return [term.strip() for term in value.split(',') if term.strip()]
+        return terms('include'), terms('exclude')
+
+    def get_menu_cache_key(self, snapshot):
+        include, exclude = self.get_ingredient_filters()
+        if include or exclude:
+            return None
+        # keyed by the matched category, not the raw query string
+        return f"by-category:{self.get_category_id(snapshot)}"
+
+    def get_menu_data(self, snapshot):
+        category_id = self.get_category_id(snapshot)
+        include, exclude = self.get_ingredient_filters()
+        items = snapshot.items
+        if include or exclude:
+            items = get_ingredient_index(snapshot).filter(include, exclude)
+        if category_id is not None:
+            items = [item for item in items if item.category_id == category_id]
+        return self.get_serializer(items, many=True).data
+
+class MenuGroupedView(CachedMenuListMixin, ListAPIView):
+    """
+    The whole menu grouped by category, with item counts and price ranges,
+    for clients that load the menu in one round trip.
+    """
+    queryset = MenuItem.objects.select_related('category')
+    serializer_class = MenuItemSerializer
+
+    def get_menu_data(self, snapshot):
+        # snapshot.items comes from one items-join-categories query
+        items_by_category = {}
+        for item in snapshot.items:
+            items_by_category.setdefault(item.category_id, []).append(item)
+
+        groups = []
+        for category in sorted(snapshot.categories, key=lambda c: c.name_key):
+            items = sorted(items_by_category.get(category.id, []), key=lambda item: item.name)
+            prices = [item.price for item in items]
+            groups.append({
+                "id": category.id,
+                "name": category.name,
+                "item_count": len(items),
+                "min_price": str(min(prices)) if prices else None,
+                "max_price": str(max(prices)) if prices else None,
+                "items": self.get_serializer(items, many=True).data,
+            })
+        return groups
+
 class TableDetailView(RetrieveAPIView):
     queryset = Table.objects.all()
     serializer_class = TableSerializer
@@ -264,20 +339,117 @@ class AvailableTablesAPIView(ListAPIView):
     def get_queryset(self):
         return Table.objects.filter(is_available=True)
 
+class TableAvailabilitySearchView(APIView):
+    """
+    Tables that seat a party between two times:
+    ?party_size=4&start=...&end=...  -> free tables for the whole window
+    add &duration=120&step=30        -> free tables for every slot in the window
+    """
+
+    def get(self, request):
+        params = TableAvailabilitySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        index = AvailabilityIndex.load(data['start'], data['end'])
+        if 'duration' not in data:
+            tables = index.free_tables(data['party_size'], data['start'], data['end'])
+            return Response({'tables': TableSerializer(tables, many=True).data})
+
+        slots = index.slots(
+            data['party_size'], data['start'], data['end'],
+            timedelta(minutes=data['duration']), timedelta(minutes=data['step'])
+        )
+        return Response({'slots': [
+            {'start': start, 'tables': [table.id for table in tables]}
+            for start, tables in slots
+        ]})
+
+class TableAssignmentView(APIView):
+    """
+    Suggest the best-fitting free table, or tables to push together:
+    ?party_size=5 for now, add &start=...&end=... for a later slot.
+    """
+
+    def get(self, request):
+        try:
+            party_size = int(request.query_params.get('party_size', ''))
+        except ValueError:
+            return Response({"detail": "party_size must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        if party_size < 1:
+            return Response({"detail": "party_size must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = end = None
+        if 'start' in request.query_params:
+            params = TableAvailabilitySerializer(data={**request.query_params.dict(), 'party_size': party_size})
+            params.is_valid(raise_exception=True)
+            start, end = params.validated_data['start'], params.validated_data['end']
+
+        tables = suggest_tables(party_size, start, end)
+        if not tables:
+            return Response({"detail": f"No free tables can seat a party of {party_size}."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        seats = sum(table.capacity for table in tables)
+        return Response({
+            'party_size': party_size,
+            'tables': TableSerializer(tables, many=True).data,
+            'seats': seats,
+            'spare_seats': seats - party_size,
+        })
+
+
+class WaitlistView(ListCreateAPIView):
+    """
+    Waiting parties with their queue position and estimated wait, for
+    staff only (it lists customer names); POST joins the waitlist.
+    """
+    serializer_class = WaitlistEntrySerializer
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [AllowAny()]
+        return [IsAdminUser()]
+
+    def list(self, request, *args, **kwargs):
+        entries = waitlist_with_estimates()
+        return Response(self.get_serializer(entries, many=True).data)
+
+    def perform_create(self, serializer):
+        user = self.request.user if self.request.user.is_authenticated else None
+        entry = serializer.save(user=user)
+        entry.position = waitlist_position(entry)
+        if entry.position is not None:
+            entry.estimated_wait = turnover_stats.estimate_wait(entry.party_size, entry.position)
+
+
+class ReservationListCreateView(ListCreateAPIView):
+    """
+    The current user's upcoming reservations; POST books a table for a time slot.
+    """
+    serializer_class = ReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Reservation.objects.filter(
+            user=self.request.user, ends_at__gt=timezone.now()
+        ).order_by('starts_at')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
 
 # ---------------------------
 # TABLE AVAILABILITY PAGE
 # ---------------------------
 def table_availability(request):
-    tables = Table.objects.all().order_by('table_number')
-    available_tables = Table.objects.filter(is_available=True).order_by('table_number')
+    tables = list(Table.objects.all().order_by('table_number'))
+    available_tables = [table for table in tables if table.is_available]
 
     context = {
         'tables': tables,
         'available_tables': available_tables,
-        'total_tables': tables.count(),
-        'available_count': available_tables.count(),
-        'occupied_count': tables.count() - available_tables.count()
+        **occupancy_summary(),
     }
 
     return render(request, 'table_availability.html', context)
@@ -286,11 +458,13 @@ def table_availability(request):
 # ---------------------------
 # RESERVE TABLE
 # ---------------------------
+DEFAULT_RESERVATION_LENGTH = timedelta(hours=2)
+
 @login_required
 def reserve_table(request, table_id):
     table = get_object_or_404(Table, id=table_id)
 
-    if not table.is_available:
+    if not table.is_available and request.method != "POST":
         messages.error(request, f"Table {table.table_number} is already occupied.")
         return redirect('table_availability')
 
@@ -303,9 +477,39 @@ def reserve_table(request, table_id):
             messages.error(request, f"Table {table.table_number} only accommodates {table.capacity} people.")
             return redirect('table_availability')
 
-        # Mark table as occupied
-        table.is_available = False
-        table.save()
+        starts_at = parse_datetime(request.POST.get("starts_at") or '')
+        if starts_at:
+            # booking a future time slot
+            if timezone.is_naive(starts_at):
+                starts_at = timezone.make_aware(starts_at)
+            ends_at = parse_datetime(request.POST.get("ends_at") or '')
+            if ends_at is None:
+                ends_at = starts_at + DEFAULT_RESERVATION_LENGTH
+            elif timezone.is_naive(ends_at):
+                ends_at = timezone.make_aware(ends_at)
+            try:
+                book_table(table.id, party_size, starts_at, ends_at, customer_name, user=request.user)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                messages.success(request, f"Table {table.table_number} reserved for {customer_name} at {starts_at:%Y-%m-%d %H:%M}!")
+            return redirect('table_availability')
+
+        # Mark table as occupied, only if nobody took it in the meantime; otherwise queue the party
+        if not seat_table(table):
+            try:
+                entry = join_waitlist(customer_name, party_size, user=request.user)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('table_availability')
+            position = waitlist_position(entry)
+            wait = turnover_stats.estimate_wait(party_size, position)
+            messages.info(
+                request,
+                f"Table {table.table_number} is occupied. {customer_name} is number {position} on the "
+                f"waitlist, estimated wait {int(wait.total_seconds() // 60)} minutes."
+            )
+            return redirect('table_availability')
 
         messages.success(request, f"Table {table.table_number} reserved successfully for {customer_name}!")
         return redirect('table_availability')
@@ -321,9 +525,11 @@ def release_table(request, table_id):
     table = get_object_or_404(Table, id=table_id)
 
     if request.user.is_staff or request.user.is_superuser:
-        table.is_available = True
-        table.save()
-        messages.success(request, f"Table {table.table_number} is now available.")
+        promoted = release_and_promote(table)
+        if promoted:
+            messages.success(request, f"Table {table.table_number} is now seating {promoted.customer_name} from the waitlist.")
+        else:
+            messages.success(request, f"Table {table.table_number} is now available.")
     else:
         messages.error(request, "You don't have permission to release tables.")
 
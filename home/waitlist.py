@@ -0,0 +1,244 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+from operator import itemgetter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Table, WaitlistEntry
+
+# assumed time at a table until real turnovers have been seen
+DEFAULT_TURNOVER = timedelta(minutes=60)
+# weight of the newest turnover in the rolling average
+TURNOVER_ALPHA = 0.2
+
+
+class TurnoverStats:
+    """
+    Rolling table-turnover statistics, kept in memory and fed by seat /
+    release events.
+
+    Per table capacity it keeps an exponentially weighted average of how
+    long parties stay, and the occupied tables sorted by when they were
+    seated; a party's k-th suitable table to free up is found by bisecting
+    those lists, so seat / release events and estimates cost O(log n)
+    per capacity however long the waitlist is.
+
+    Each process keeps its own statistics, loaded from the tables on first
+    use; table edits (see home.signals) reload the capacities.
+    """
+
+    def __init__(self, default_turnover=DEFAULT_TURNOVER, alpha=TURNOVER_ALPHA):
+        self.default_turnover = default_turnover.total_seconds()
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget everything; tables are reloaded on next use.
+        """
+        self._loaded = False
+        self.turnover = {}    # capacity -> average seconds at the table
+        self.occupied = {}    # capacity -> sorted list of (occupied_since, table_id)
+        self.seated_at = {}   # table_id -> (capacity, occupied_since)
+        self.capacities = None
+
+    def tables_changed(self):
+        with self._lock:
+            self.capacities = None
+
+    def _load(self):
+        if not self._loaded:
+            tables = Table.objects.filter(
+                is_available=False, occupied_since__isnull=False
+            ).values_list('id', 'capacity', 'occupied_since')
+            for table_id, capacity, since in tables:
+                self._seat(table_id, capacity, since)
+            self._loaded = True
+        if self.capacities is None:
+            self.capacities = sorted(set(Table.objects.values_list('capacity', flat=True)))
+
+    def _seat(self, table_id, capacity, since):
+        if self.seated_at.get(table_id) == (capacity, since):
+            # already picked up by _load()
+            return
+        self._unseat(table_id)
+        self.seated_at[table_id] = (capacity, since)
+        insort(self.occupied.setdefault(capacity, []), (since, table_id))
+
+    def _unseat(self, table_id):
+        seated = self.seated_at.pop(table_id, None)
+        if seated is None:
+            return None
+        capacity, since = seated
+        queue = self.occupied[capacity]
+        del queue[bisect_left(queue, (since, table_id))]
+        return since
+
+    def seated(self, table_id, capacity, since):
+        with self._lock:
+            self._load()
+            self._seat(table_id, capacity, since)
+
+    def released(self, table_id, capacity, at):
+        with self._lock:
+            self._load()
+            since = self._unseat(table_id)
+            if since is not None:
+                stay = (at - since).total_seconds()
+                average = self.turnover.get(capacity, self.default_turnover)
+                self.turnover[capacity] = average + self.alpha * (stay - average)
+
+    def average_turnover(self, capacity):
+        return timedelta(seconds=self.turnover.get(capacity, self.default_turnover))
+
+    def largest_capacity(self):
+        with self._lock:
+            self._load()
+            return self.capacities[-1] if self.capacities else 0
+
+    def estimate_wait(self, party_size, position, now=None):
+        """
+        Expected wait for the ``position``-th party (1-based) among those
+        competing for the tables that seat ``party_size``, or None if no
+        table is large enough.
+        """
+        now = now or timezone.now()
+        with self._lock:
+            self._load()
+            if not self.capacities or party_size > self.capacities[-1]:
+                return None
+
+            # occupied suitable tables, each list sorted by expected release
+            queues = [
+                (timedelta(seconds=self.turnover.get(capacity, self.default_turnover)), queue)
+                for capacity, queue in self.occupied.items() if capacity >= party_size and queue
+            ]
+            occupied = sum(len(queue) for turnover, queue in queues)
+            if not occupied:
+                return timedelta(0)
+
+            expected = self._release_time(queues, min(position, occupied))
+            if position > occupied:
+                # more parties than occupied tables: each further round takes a full turnover
+                rounds = -(-(position - occupied) // occupied)
+                expected += min(turnover for turnover, queue in queues) * rounds
+            return max(expected - now, timedelta(0))
+
+    @staticmethod
+    def _release_time(queues, k):
+        """
+        k-th earliest expected release across ``queues`` (1-based): for each
+        queue, bisect for its first release with at least k releases at or
+        before it; the answer is the one with fewer than k strictly before.
+        """
+        def released_by(at, strictly=False):
+            find = bisect_left if strictly else bisect_right
+            return sum(find(queue, at - turnover, key=itemgetter(0)) for turnover, queue in queues)
+
+        for turnover, queue in queues:
+            low, high = 0, len(queue)
+            while low < high:
+                middle = (low + high) // 2
+                if released_by(queue[middle][0] + turnover) < k:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < len(queue):
+                release = queue[low][0] + turnover
+                if released_by(release, strictly=True) < k:
+                    return release
+        raise ValueError("k is larger than the number of occupied tables")
+
+
+turnover_stats = TurnoverStats()
+
+
+def join_waitlist(customer_name, party_size, user=None):
+    """
+    :raises ValidationError: if no table seats ``party_size``.
+    """
+    if party_size > turnover_stats.largest_capacity():
+        raise ValidationError(f"No table seats a party of {party_size}.")
+    return WaitlistEntry.objects.create(customer_name=customer_name, party_size=party_size, user=user)
+
+
+def waitlist_position(entry):
+    """
+    Place of ``entry`` (1-based) among the waiting parties competing for
+    its tables, or None if no table seats it.
+
+    A released table seats the longest-waiting party that fits, so every
+    earlier party that fits any table (party_size <= the largest capacity)
+    can take a table this one could have used.
+    """
+    largest = turnover_stats.largest_capacity()
+    if entry.party_size > largest:
+        return None
+    return WaitlistEntry.objects.filter(
+        status=WaitlistEntry.WAITING, party_size__lte=largest, id__lte=entry.id
+    ).count()
+
+
+def waitlist_with_estimates(now=None):
+    """
+    Waiting parties in arrival order, each with its place in the queue (see
+    waitlist_position) and an estimated wait, from one query.
+    """
+    now = now or timezone.now()
+    largest = turnover_stats.largest_capacity()
+    entries = list(WaitlistEntry.objects.filter(status=WaitlistEntry.WAITING).order_by('created_at', 'id'))
+    position = 0
+    for entry in entries:
+        if entry.party_size > largest:
+            entry.position = entry.estimated_wait = None
+            continue
+        position += 1
+        entry.position = position
+        entry.estimated_wait = turnover_stats.estimate_wait(entry.party_size, position, now)
+    return entries
+
+
+def seat_table(table, now=None):
+    """
+    Mark ``table`` occupied if it is free, with a conditional UPDATE.
+
+    :return: True if the table was free and is now occupied.
+    """
+    now = now or timezone.now()
+    seated = Table.objects.filter(pk=table.pk, is_available=True).update(is_available=False, occupied_since=now)
+    if seated:
+        transaction.on_commit(lambda: turnover_stats.seated(table.pk, table.capacity, now))
+    return bool(seated)
+
+
+def release_and_promote(table, now=None):
+    """
+    Free ``table``, record how long it was occupied and seat the longest
+    waiting party that fits it.
+
+    :return: the promoted WaitlistEntry, or None.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        released = Table.objects.filter(pk=table.pk, is_available=False).update(is_available=True, occupied_since=None)
+        if released:
+            transaction.on_commit(lambda: turnover_stats.released(table.pk, table.capacity, now))
+
+        entry = WaitlistEntry.objects.select_for_update().filter(
+            status=WaitlistEntry.WAITING, party_size__lte=table.capacity
+        ).order_by('created_at', 'id').first()
+        if entry is None:
+            return None
+        if not Table.objects.filter(pk=table.pk, is_available=True).update(is_available=False, occupied_since=now):
+            return None
+
+        entry.status = WaitlistEntry.SEATED
+        entry.table = table
+        entry.seated_at = now
+        entry.save(update_fields=['status', 'table', 'seated_at'])
+        transaction.on_commit(lambda: turnover_stats.seated(table.pk, table.capacity, now))
+    return entry
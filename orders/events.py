@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    One listener on an event bus, consumed from an asyncio event loop.
+    """
+
+    def __init__(self, bus, loop, max_pending):
+        self._bus = bus
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=max_pending)
+
+    def _deliver(self, event):
+        # runs on the subscriber's loop; a slow client drops its oldest event
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    def push(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # the loop has been closed, the client is gone
+            self.close()
+
+    async def get(self, timeout=None):
+        """
+        Wait for the next event, raises asyncio.TimeoutError after ``timeout`` seconds.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class InProcessEventBus:
+    """
+    Publish/subscribe bus that lives in the current process.
+
+    publish() may be called from any thread (sync views, signal handlers);
+    events are handed to every subscriber's event loop without blocking.
+    A broker-backed bus only needs the same publish()/subscribe() methods
+    and can be selected with settings.ORDER_EVENT_BUS.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        """
+        Register a listener; must be called from inside a running event loop.
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+_event_buses = {}
+_event_bus_lock = threading.Lock()
+
+
+def _get_bus(setting):
+    if setting not in _event_buses:
+        with _event_bus_lock:
+            if setting not in _event_buses:
+                backend = getattr(settings, setting, 'orders.events.InProcessEventBus')
+                _event_buses[setting] = import_string(backend)()
+    return _event_buses[setting]
+
+
+def get_event_bus():
+    """
+    Return the process-wide order event bus (settings.ORDER_EVENT_BUS).
+    """
+    return _get_bus('ORDER_EVENT_BUS')
+
+
+def get_alert_bus():
+    """
+    Return the process-wide inventory alert bus (settings.INVENTORY_ALERT_BUS)
+    that purchasing listens on.
+    """
+    return _get_bus('INVENTORY_ALERT_BUS')
+
+
+def order_event(event_type, order, status_name=None, items=None):
+    """
+    Build the JSON-serialisable payload published for an order.
+    """
+    return {
+        'type': event_type,
+        'id': order.pk,
+        'order_id': order.order_id,
+        'customer_name': order.customer_name,
+        'status': status_name,
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+        'total_amount': str(order.total_amount),
+        'items': items or [],
+    }
+
+
+def stock_alert_event(item, low_stock, alert_id=None):
+    """
+    Build the payload published when ``item`` (a mapping with id, name,
+    quantity, unit and minimum_threshold) crosses its minimum threshold;
+    ``alert_id`` is the stored StockAlert to acknowledge it by.
+    """
+    return {
+        'type': 'inventory.low_stock' if low_stock else 'inventory.restocked',
+        'alert_id': alert_id,
+        'id': item['id'],
+        'name': item['name'],
+        'quantity': str(item['quantity']),
+        'unit': item['unit'],
+        'minimum_threshold': str(item['minimum_threshold']),
+    }
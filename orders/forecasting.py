@@ -0,0 +1,136 @@
+"""
+Demand forecasting for inventory reorder suggestions.
+
+Daily stock usage is derived from order lines and their recipes, loaded
+into an (items x days) NumPy matrix and smoothed for every item at once.
+NumPy is optional: install it to use this module.
+"""
+from datetime import timedelta
+from decimal import ROUND_UP, Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import InventoryItem, OrderItem, OrderStatus
+from .registry import get_order_status
+from .reports import start_of_day
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+DEMAND_CHUNK_SIZE = 10000
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("Demand forecasting needs NumPy; install it with 'pip install numpy'.")
+
+
+def check_alpha(alpha):
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+
+
+def load_daily_demand(item_ids, start, days):
+    """
+    Daily usage of each inventory item over ``days`` days from ``start``.
+
+    Usage is summed per (item, day) in the database and streamed back in
+    one query.
+
+    :return: float matrix of shape (len(item_ids), days), rows in ``item_ids`` order.
+    """
+    require_numpy()
+    position = {pk: row for row, pk in enumerate(item_ids)}
+    demand = np.zeros((len(item_ids), days))
+
+    lines = OrderItem.objects.filter(
+        order__created_at__gte=start_of_day(start),
+        order__created_at__lt=start_of_day(start + timedelta(days=days)),
+        menu_item__recipe_components__inventory_item_id__in=item_ids,
+    )
+    try:
+        lines = lines.exclude(order__status_id=get_order_status('cancelled').pk)
+    except OrderStatus.DoesNotExist:
+        pass
+
+    rows = lines.values(
+        item=F('menu_item__recipe_components__inventory_item_id'),
+        day=TruncDate('order__created_at'),
+    ).annotate(
+        used=Sum(F('quantity') * F('menu_item__recipe_components__quantity'), output_field=FloatField())
+    ).values_list('item', 'day', 'used').order_by()
+
+    first = start.toordinal()
+    rows_index, days_index, used = [], [], []
+    for item, day, amount in rows.iterator(chunk_size=DEMAND_CHUNK_SIZE):
+        rows_index.append(position[item])
+        days_index.append(day.toordinal() - first)
+        used.append(amount)
+    if used:
+        np.add.at(demand, (np.array(rows_index), np.array(days_index)), np.array(used))
+    return demand
+
+
+def smoothed_daily_demand(demand, alpha=0.3):
+    """
+    Simple exponential smoothing of every row of ``demand`` at once.
+
+    The smoothed level after the last day is a fixed weighting of the
+    history (alpha * (1 - alpha) ** age, the first day carrying the rest),
+    so all items are forecast with a single matrix-vector product.
+    """
+    require_numpy()
+    check_alpha(alpha)
+    days = demand.shape[1]
+    if days == 0:
+        return np.zeros(demand.shape[0])
+
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return demand @ weights
+
+
+def forecast_reorders(history_days=90, horizon_days=7, alpha=0.3, today=None):
+    """
+    Suggest how much of each inventory item to order.
+
+    The target level is ``minimum_threshold`` plus the forecast usage over
+    the next ``horizon_days``; the suggestion is whatever is needed to get
+    from the current quantity up to it.
+
+    :return: list of dicts for items that need ordering, largest first.
+    """
+    require_numpy()
+    check_alpha(alpha)
+    today = today or timezone.localdate()
+    items = list(InventoryItem.objects.order_by('id').values(
+        'id', 'name', 'unit', 'quantity', 'minimum_threshold'
+    ))
+    if not items:
+        return []
+
+    start = today - timedelta(days=history_days)
+    demand = load_daily_demand([item['id'] for item in items], start, history_days)
+    daily = smoothed_daily_demand(demand, alpha)
+
+    quantity = np.array([float(item['quantity']) for item in items])
+    threshold = np.array([float(item['minimum_threshold']) for item in items])
+    reorder = np.maximum(threshold + daily * horizon_days - quantity, 0)
+
+    needed = np.flatnonzero(reorder >= 0.005)
+    needed = needed[np.argsort(-reorder[needed], kind='stable')]
+
+    suggestions = []
+    for index in needed:
+        item = items[index]
+        suggestions.append({
+            **item,
+            'daily_demand': Decimal(f'{daily[index]:.3f}'),
+            'reorder_quantity': Decimal(f'{reorder[index]:.6f}').quantize(Decimal('0.01'), rounding=ROUND_UP),
+        })
+    return suggestions
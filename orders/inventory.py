@@ -0,0 +1,314 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .events import get_alert_bus, stock_alert_event
+from .models import (
+    InventoryItem, OrderItem, OrderStockRecord, RecipeComponent, StockAlert, StockMovement, StockSnapshot
+)
+
+# sign of the stock change for each kind of movement, None if the amount is signed
+MOVEMENT_SIGNS = {
+    StockMovement.RECEIPT: 1,
+    StockMovement.USAGE: -1,
+    StockMovement.WASTE: -1,
+    StockMovement.ADJUSTMENT: None,
+}
+
+# most unacknowledged alerts returned at once
+ALERT_BATCH = 100
+
+
+def recipe_usage(quantities):
+    """
+    Stock used by a set of order lines, from one query over the recipes.
+
+    :param quantities: mapping of menu item id -> portions.
+    :return: mapping of inventory item id -> quantity used.
+    """
+    usage = defaultdict(Decimal)
+    components = RecipeComponent.objects.filter(
+        menu_item_id__in=list(quantities)
+    ).values_list('menu_item_id', 'inventory_item_id', 'quantity')
+    for menu_item_id, inventory_item_id, quantity in components:
+        usage[inventory_item_id] += quantity * quantities[menu_item_id]
+    return dict(usage)
+
+
+def publish_stock_alerts(items, low_stock):
+    """
+    Record a low-stock / restocked StockAlert for each item (mappings with
+    id, name, quantity, unit and minimum_threshold) in the current
+    transaction and push it to the alert bus once that commits.
+
+    The rows stay until acknowledged, so clients that were not connected,
+    or listen in another process, still get them from unacknowledged_alerts().
+    """
+    if not items:
+        return
+    alerts = StockAlert.objects.bulk_create([
+        StockAlert(
+            inventory_item_id=item['id'],
+            kind=StockAlert.LOW_STOCK if low_stock[item['id']] else StockAlert.RESTOCKED,
+            quantity=item['quantity'],
+            minimum_threshold=item['minimum_threshold'],
+        )
+        for item in items
+    ])
+    events = [stock_alert_event(item, low_stock[item['id']], alert.pk) for item, alert in zip(items, alerts)]
+
+    def publish():
+        bus = get_alert_bus()
+        for event in events:
+            bus.publish(event)
+
+    transaction.on_commit(publish)
+
+
+def unacknowledged_alerts(after=None, limit=ALERT_BATCH):
+    """
+    Alert events not acknowledged yet, oldest first, optionally only those
+    after the alert id ``after``.
+    """
+    alerts = StockAlert.objects.filter(acknowledged_at__isnull=True).select_related('inventory_item').order_by('id')
+    if after:
+        alerts = alerts.filter(id__gt=after)
+    return [
+        stock_alert_event(
+            {
+                'id': alert.inventory_item_id,
+                'name': alert.inventory_item.name,
+                'quantity': alert.quantity,
+                'unit': alert.inventory_item.unit,
+                'minimum_threshold': alert.minimum_threshold,
+            },
+            alert.kind == StockAlert.LOW_STOCK,
+            alert.pk
+        )
+        for alert in alerts[:limit]
+    ]
+
+
+def acknowledge_alerts(alert_ids, user=None):
+    """
+    Mark alerts as handled with one UPDATE; returns how many were open.
+    """
+    return StockAlert.objects.filter(pk__in=list(alert_ids), acknowledged_at__isnull=True).update(
+        acknowledged_at=timezone.now(), acknowledged_by=user
+    )
+
+
+def apply_stock_deltas(deltas, kind, user=None, order=None, note=''):
+    """
+    Add ``deltas`` (inventory item id -> signed quantity) to stock levels and
+    record them in the ledger.
+
+    The rows are locked and read once to see which items cross their
+    minimum threshold; levels then change with a single UPDATE ... SET
+    quantity = quantity + CASE ... END that also flips their low-stock flag,
+    and the ledger rows are written with one bulk INSERT in the same
+    transaction. Alerts for the crossings go out after commit.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+
+    delta = Case(
+        *[When(pk=pk, then=Value(value)) for pk, value in deltas.items()],
+        output_field=DecimalField(max_digits=12, decimal_places=3)
+    )
+    with transaction.atomic(savepoint=False):
+        items = InventoryItem.objects.select_for_update().filter(pk__in=list(deltas)).values(
+            'id', 'name', 'quantity', 'unit', 'minimum_threshold', 'low_stock'
+        )
+        crossed = []
+        for item in items:
+            item['quantity'] += deltas[item['id']]
+            if (item['quantity'] <= item['minimum_threshold']) != item['low_stock']:
+                crossed.append(item)
+        low_stock = {item['id']: not item['low_stock'] for item in crossed}
+
+        changes = {'quantity': F('quantity') + delta, 'last_updated': timezone.now()}
+        if crossed:
+            changes['low_stock'] = Case(
+                *[When(pk=pk, then=Value(low)) for pk, low in low_stock.items()],
+                default=F('low_stock')
+            )
+        updated = InventoryItem.objects.filter(pk__in=list(deltas)).update(**changes)
+        StockMovement.objects.bulk_create([
+            StockMovement(inventory_item_id=pk, kind=kind, delta=value,
+                          order=order, created_by=user, note=note)
+            for pk, value in deltas.items()
+        ])
+        publish_stock_alerts(crossed, low_stock)
+    return updated
+
+
+def consume_stock(order, quantities):
+    """
+    Take the stock used by ``order``'s lines (menu item id -> portions) and
+    record it against the order. Run inside the order's transaction.
+    """
+    usage = recipe_usage(quantities)
+    OrderStockRecord.objects.create(order=order, taken=stock_record(usage))
+    return apply_stock_deltas(
+        {pk: -used for pk, used in usage.items()},
+        StockMovement.USAGE,
+        user=order.user,
+        order=order,
+        note=f"Order {order.order_id}"
+    )
+
+
+def order_quantities(order_pk):
+    """
+    Portions per menu item on an order's current lines.
+    """
+    return dict(
+        OrderItem.objects.filter(order_id=order_pk).values('menu_item_id').annotate(
+            portions=Sum('quantity')
+        ).values_list('menu_item_id', 'portions')
+    )
+
+
+def stock_record(usage):
+    # JSON form of an OrderStockRecord's ``taken``
+    return {str(pk): str(used) for pk, used in usage.items() if used}
+
+
+def recorded_usage(taken):
+    return {int(pk): Decimal(used) for pk, used in taken.items()}
+
+
+def stock_taken_by(order_pk):
+    """
+    Stock an order holds (inventory item id -> quantity), or None if it
+    has no stock record (placed before orders kept one).
+    """
+    taken = OrderStockRecord.objects.filter(order_id=order_pk).values_list('taken', flat=True).first()
+    return recorded_usage(taken) if taken is not None else None
+
+
+def restock_order(order, quantities, note=''):
+    """
+    Take or put back stock so that what ``order`` holds matches the recipes
+    of ``quantities`` (menu item id -> portions; empty to put everything
+    back, e.g. when it is cancelled or deleted).
+
+    The difference to the order's OrderStockRecord is recorded against the
+    order as usage, positive where stock goes back. Orders without a record
+    are left alone: what they took is not known.
+    """
+    with transaction.atomic():
+        # the record row is locked, so one restock per order runs at a time
+        record = OrderStockRecord.objects.select_for_update().filter(order_id=order.pk).first()
+        if record is None:
+            return 0
+        taken = recorded_usage(record.taken)
+        wanted = recipe_usage(quantities) if quantities else {}
+        record.taken = stock_record(wanted)
+        record.save(update_fields=['taken'])
+        return apply_stock_deltas(
+            {pk: taken.get(pk, 0) - wanted.get(pk, 0) for pk in taken.keys() | wanted.keys()},
+            StockMovement.USAGE,
+            order=order,
+            note=note
+        )
+
+
+def record_stock_movement(inventory_item_id, kind, amount, user=None, note=''):
+    """
+    Record a receipt, usage, waste or adjustment of ``amount``.
+
+    Receipts add stock and usage/waste take it, so their amount must be
+    positive; adjustments are applied as signed.
+
+    :raises ValidationError: for an unknown kind or an invalid amount.
+    """
+    if kind not in MOVEMENT_SIGNS:
+        raise ValidationError(f"Unknown stock movement: {kind}")
+    if not amount.is_finite():
+        raise ValidationError("Please enter a valid amount.")
+
+    sign = MOVEMENT_SIGNS[kind]
+    if sign is not None:
+        if amount <= 0:
+            raise ValidationError("The amount must be greater than zero.")
+        amount *= sign
+
+    return apply_stock_deltas({inventory_item_id: amount}, kind, user=user, note=note)
+
+
+def set_stock_level(inventory_item_id, quantity, user=None, note=''):
+    """
+    Set an item's stock to a counted ``quantity``, recorded as an
+    adjustment of the difference. The row is locked while the difference
+    is taken so a concurrent movement cannot slip in between.
+    """
+    if not quantity.is_finite() or quantity < 0:
+        raise ValidationError("Please enter a valid quantity.")
+
+    with transaction.atomic():
+        current = InventoryItem.objects.select_for_update().values_list(
+            'quantity', flat=True
+        ).get(pk=inventory_item_id)
+        return apply_stock_deltas(
+            {inventory_item_id: quantity - current},
+            StockMovement.ADJUSTMENT,
+            user=user,
+            note=note or "Stock count"
+        )
+
+
+def compact_stock_ledger(before):
+    """
+    Fold ledger movements created before ``before`` into one StockSnapshot
+    per item (its level at ``before`` and per-kind totals) and delete them.
+
+    :return: (snapshots created, movements removed).
+    """
+    kind_total = lambda kind: Sum('delta', filter=Q(kind=kind), default=Decimal(0))
+
+    with transaction.atomic():
+        old = StockMovement.objects.filter(created_at__lt=before)
+        item_ids = list(old.values_list('inventory_item_id', flat=True).distinct())
+        if not item_ids:
+            return 0, 0
+
+        # lock the levels first, so no movement lands between them and the later deltas
+        levels = dict(
+            InventoryItem.objects.select_for_update().filter(pk__in=item_ids).values_list('pk', 'quantity')
+        )
+        later = dict(
+            StockMovement.objects.filter(inventory_item_id__in=item_ids, created_at__gte=before)
+            .values('inventory_item_id').annotate(total=Sum('delta'))
+            .values_list('inventory_item_id', 'total')
+        )
+        totals = old.values('inventory_item_id').annotate(
+            received=kind_total(StockMovement.RECEIPT),
+            used=kind_total(StockMovement.USAGE),
+            wasted=kind_total(StockMovement.WASTE),
+            adjusted=kind_total(StockMovement.ADJUSTMENT),
+            movement_count=Count('id'),
+        )
+
+        snapshots = StockSnapshot.objects.bulk_create([
+            StockSnapshot(
+                inventory_item_id=row['inventory_item_id'],
+                taken_at=before,
+                quantity=levels[row['inventory_item_id']] - later.get(row['inventory_item_id'], 0),
+                received=row['received'],
+                used=-row['used'],
+                wasted=-row['wasted'],
+                adjusted=row['adjusted'],
+                movement_count=row['movement_count'],
+            )
+            for row in totals
+        ])
+        removed, _ = old.delete()
+
+    return len(snapshots), removed
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from orders.models import Order
+
+class Command(BaseCommand):
+    help = 'Recompute the stored total_amount of every order from its items'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Backfilling order totals...')
+
+        updated = Order.objects.recalculate_totals()
+
+        self.stdout.write(self.style.SUCCESS(f'Updated totals for {updated} orders.'))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.inventory import compact_stock_ledger
+
+class Command(BaseCommand):
+    help = 'Fold old stock movements into per-item snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=90, help='Days of individual movements to keep (default: 90)')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['keep_days'])
+        self.stdout.write(f'Compacting stock movements before {before:%Y-%m-%d %H:%M}...')
+
+        snapshots, removed = compact_stock_ledger(before)
+
+        self.stdout.write(self.style.SUCCESS(f'Folded {removed} movements into {snapshots} snapshots.'))
@@ -0,0 +1,29 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from orders.forecasting import forecast_reorders
+
+class Command(BaseCommand):
+    help = 'Suggest inventory reorder quantities from forecast demand'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=90, help='Days of order history to learn from (default: 90)')
+        parser.add_argument('--horizon-days', type=int, default=7, help='Days of demand to cover (default: 7)')
+        parser.add_argument('--alpha', type=float, default=0.3, help='Smoothing factor in (0, 1] (default: 0.3)')
+
+    def handle(self, *args, **options):
+        try:
+            suggestions = forecast_reorders(
+                history_days=options['history_days'],
+                horizon_days=options['horizon_days'],
+                alpha=options['alpha']
+            )
+        except (ImproperlyConfigured, ValueError) as e:
+            raise CommandError(str(e))
+
+        for item in suggestions:
+            self.stdout.write(
+                f"{item['name']}: order {item['reorder_quantity']} {item['unit']} "
+                f"(have {item['quantity']}, using ~{item['daily_demand']}/day)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'{len(suggestions)} items need reordering.'))
@@ -0,0 +1,45 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.services import create_coupon_campaign
+
+class Command(BaseCommand):
+    help = 'Generate a campaign of unique coupon codes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of coupons to create')
+        parser.add_argument('--discount', type=Decimal, required=True, help='Discount percentage')
+        parser.add_argument('--valid-from', type=date.fromisoformat, default=date.today(), help='YYYY-MM-DD, defaults to today')
+        parser.add_argument('--valid-until', type=date.fromisoformat, required=True, help='YYYY-MM-DD')
+        parser.add_argument('--length', type=int, default=10, help='Code length')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Coupons per insert transaction')
+        parser.add_argument('--output', help='Write the generated codes to this file, one per line')
+
+    def handle(self, *args, **options):
+        if options['count'] <= 0:
+            raise CommandError('count must be positive')
+        if options['valid_until'] < options['valid_from']:
+            raise CommandError('--valid-until must not be before --valid-from')
+
+        self.stdout.write(f"Generating {options['count']} coupons...")
+
+        def report(created, total):
+            self.stdout.write(f'  {created}/{total} coupons created')
+
+        codes = create_coupon_campaign(
+            options['count'],
+            options['discount'],
+            options['valid_from'],
+            options['valid_until'],
+            length=options['length'],
+            chunk_size=options['chunk_size'],
+            progress=report
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write('\n'.join(codes) + '\n')
+            self.stdout.write(f"Codes written to {options['output']}")
+
+        self.stdout.write(self.style.SUCCESS(f'Created {len(codes)} coupons.'))
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from orders.reports import rebuild_sales_rollups
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the daily sales rollups and per-order sales records from completed orders. '
+        'Run backfill_order_totals first if order totals may be missing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding daily sales rollups...')
+
+        days = rebuild_sales_rollups(options['start'], options['end'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {days} days.'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_inventoryitem_customerreview_staff_shift'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_menucategory_name_key'),
+        ('orders', '0010_dailyspecial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=10)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_components', to='orders.inventoryitem')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_components', to='home.menuitem')),
+            ],
+            options={
+                'unique_together': {('menu_item', 'inventory_item')},
+            },
+        ),
+    ]
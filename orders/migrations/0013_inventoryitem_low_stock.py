@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+def fill_low_stock(apps, schema_editor):
+    InventoryItem = apps.get_model('orders', 'InventoryItem')
+    InventoryItem.objects.filter(quantity__lte=models.F('minimum_threshold')).update(low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='low_stock',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(fill_low_stock, migrations.RunPython.noop),
+    ]
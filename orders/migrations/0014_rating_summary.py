@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_rating_summary(apps, schema_editor):
+    CustomerReview = apps.get_model('orders', 'CustomerReview')
+    RatingSummary = apps.get_model('orders', 'RatingSummary')
+    approved = CustomerReview.objects.filter(is_approved=True)
+    totals = approved.aggregate(
+        review_count=models.Count('id'),
+        rating_sum=models.Sum('rating', default=0),
+        **{f'star_{stars}': models.Count('id', filter=models.Q(rating=stars)) for stars in range(1, 6)}
+    )
+    RatingSummary.objects.create(pk=1, **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_inventoryitem_low_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('star_1', models.PositiveIntegerField(default=0)),
+                ('star_2', models.PositiveIntegerField(default=0)),
+                ('star_3', models.PositiveIntegerField(default=0)),
+                ('star_4', models.PositiveIntegerField(default=0)),
+                ('star_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customerreview',
+            index=models.Index(fields=['is_approved', 'created_at', 'id'], name='review_approved_created_idx'),
+        ),
+        migrations.RunPython(build_rating_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0015_review_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSalesRecord',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_record', serialize=False, to='orders.order')),
+                ('sales', models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0016_order_sales_record'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventoryitem',
+            name='minimum_threshold',
+            field=models.DecimalField(decimal_places=3, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='inventoryitem',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, max_digits=12),
+        ),
+    ]
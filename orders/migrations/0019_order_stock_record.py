@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_stock_records(apps, schema_editor):
+    # orders whose usage is still in the ledger; older or compacted ones get
+    # no record and are left alone by later edits
+    StockMovement = apps.get_model('orders', 'StockMovement')
+    OrderStockRecord = apps.get_model('orders', 'OrderStockRecord')
+    taken = {}
+    usage = StockMovement.objects.filter(kind='usage', order__isnull=False).values(
+        'order_id', 'inventory_item_id'
+    ).annotate(total=models.Sum('delta')).order_by('order_id')
+    for row in usage.iterator():
+        held = taken.setdefault(row['order_id'], {})
+        if row['total']:
+            held[str(row['inventory_item_id'])] = str(-row['total'])
+    OrderStockRecord.objects.bulk_create(
+        [OrderStockRecord(order_id=order_id, taken=held) for order_id, held in taken.items()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0018_stock_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStockRecord',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_record', serialize=False, to='orders.order')),
+                ('taken', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.RunPython(fill_stock_records, migrations.RunPython.noop),
+    ]
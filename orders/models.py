@@ -1,16 +1,39 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 from .utility import generate_coupon_code, generate_unique_order_id
 
 
+def order_items_total():
+    """
+    Subquery expression: sum(price * quantity) of the outer order's items.
+    """
+    totals = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        total=Sum(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+    ).values('total')
+    return Coalesce(
+        Subquery(totals, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        Value(Decimal("0.00")),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
 #  Custom Manager
 class ActiveOrderManager(models.Manager):
     def get_active_orders(self):
         return self.filter(status__name__in=["pending", "processing"])
 
+    def recalculate_totals(self, **filters):
+        """
+        Recompute the stored total of the matching orders from their items
+        with a single UPDATE. Returns the number of orders updated.
+        """
+        return self.filter(**filters).update(total_amount=order_items_total())
+
 
 #  Menu Category Model
 class MenuCategory(models.Model):
@@ -45,9 +68,23 @@ class Coupon(models.Model):
         return f"{self.code} ({self.discount_percentage}% off)"
 
 
+#  Order ID Node Model
+class OrderIdNode(models.Model):
+    """
+    A node number baked into order IDs, leased to one worker process at a
+    time (see orders.utility.OrderIdGenerator).
+    """
+    node = models.PositiveSmallIntegerField(primary_key=True)
+    holder = models.CharField(max_length=255)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Node {self.node} - {self.holder}"
+
+
 #  Order Model
 class Order(models.Model):
-    order_id = models.CharField(max_length=12, unique=True, editable=False, default='')
+    order_id = models.CharField(max_length=16, unique=True, editable=False, default='')
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     customer_name = models.CharField(max_length=100)
@@ -56,8 +93,24 @@ class Order(models.Model):
 
     status = models.ForeignKey(OrderStatus, on_delete=models.SET_NULL, null=True)
 
+    # sum(price * quantity) of the order items, kept up to date by orders.signals
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"), db_index=True)
+
     objects = ActiveOrderManager()
 
+    class Meta:
+        indexes = [
+            # keyset pagination of open orders (kitchen board)
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so post_save receivers can tell when the status changed
+        instance._loaded_status_id = instance.__dict__.get('status_id')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.order_id:
             self.order_id = generate_unique_order_id()
@@ -73,6 +126,7 @@ class Order(models.Model):
     def calculate_total(self):
         """
         Total = sum(price * quantity) for all order items.
+        Recomputed from the items; use ``total_amount`` for the stored value.
         """
         total = Decimal("0.00")
 
@@ -99,6 +153,80 @@ class OrderItem(models.Model):
         return f"{self.menu_item.name} x {self.quantity}"
 
 
+#  Daily Sales Rollup Model
+class DailySalesRollup(models.Model):
+    """
+    Completed-order totals for one day, maintained by orders.reports.
+    """
+    date = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    item_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} - {self.order_count} orders, {self.gross_revenue}"
+
+
+#  Order Sales Record Model
+class OrderSalesRecord(models.Model):
+    """
+    What the daily rollups hold for one completed order (total, item count
+    and per-item lines), kept by orders.reports so that edits, cancellation
+    and deletion take out exactly what was added.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='sales_record')
+    sales = models.JSONField()
+
+    def __str__(self):
+        return f"Order {self.order_id} - {self.sales['total']}"
+
+
+#  Order Stock Record Model
+class OrderStockRecord(models.Model):
+    """
+    Stock an order holds (inventory item id -> quantity), kept by
+    orders.inventory so that edits, cancellation and deletion put back
+    exactly what was taken, whether or not the ledger has been compacted.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='stock_record')
+    taken = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Order {self.order_id} - {len(self.taken)} items"
+
+
+#  Menu Item Daily Sales Model
+class MenuItemDailySales(models.Model):
+    """
+    Completed quantity and revenue of one menu item on one day,
+    maintained by orders.reports and used for the top-sellers leaderboards.
+    """
+    date = models.DateField(db_index=True)
+    menu_item = models.ForeignKey('home.MenuItem', on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        unique_together = ['date', 'menu_item']
+
+    def __str__(self):
+        return f"{self.date} - {self.menu_item.name} x {self.quantity}"
+
+
+#  Daily Special Model
+class DailySpecial(models.Model):
+    """
+    The menu item picked as special for one business day (see
+    orders.utility.get_daily_special).
+    """
+    date = models.DateField(unique=True)
+    menu_item = models.ForeignKey('home.MenuItem', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.date} - {self.menu_item.name}"
+
+
 #  Restaurant Model
 class Restaurant(models.Model):
     name = models.CharField(max_length=200)
@@ -173,11 +301,56 @@ class CustomerReview(models.Model):
     review_text = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=True)  # For moderation
+    is_rejected = models.BooleanField(default=False)
+    # matched a moderation keyword and is held for review
+    is_flagged = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_approved', 'created_at', 'id'], name='review_approved_created_idx'),
+            models.Index(fields=['is_approved', 'is_rejected', 'created_at', 'id'], name='review_moderation_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what the rating summary counted for this review
+        instance._loaded_rating = (instance.__dict__.get('is_approved'), instance.__dict__.get('rating'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # the rating summary is adjusted by orders.signals in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Review for Order {self.order.order_id} - {self.rating} stars"
 
 
+#  Rating Summary Model
+class RatingSummary(models.Model):
+    """Running totals of approved reviews, kept in step with every review write."""
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f'star_{stars}') for stars in range(1, 6)}
+
+    def __str__(self):
+        return f"{self.review_count} reviews, average {self.average_rating:.1f}"
+
+
 #  Staff/Employee Model
 class Staff(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -207,7 +380,8 @@ class InventoryItem(models.Model):
         ('supplies', 'Supplies'),
         ('equipment', 'Equipment'),
     ])
-    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    # same precision as recipe quantities and ledger deltas
+    quantity = models.DecimalField(max_digits=12, decimal_places=3)
     unit = models.CharField(max_length=20, choices=[
         ('kg', 'Kilograms'),
         ('g', 'Grams'),
@@ -216,9 +390,22 @@ class InventoryItem(models.Model):
         ('pieces', 'Pieces'),
         ('boxes', 'Boxes'),
     ])
-    minimum_threshold = models.DecimalField(max_digits=10, decimal_places=2)
+    minimum_threshold = models.DecimalField(max_digits=12, decimal_places=3)
     supplier = models.CharField(max_length=100, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
+    # quantity <= minimum_threshold, kept up to date on every write
+    low_stock = models.BooleanField(default=False, db_index=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the flag as loaded so threshold crossings can be detected on save
+        instance._loaded_low_stock = instance.__dict__.get('low_stock')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.low_stock = Decimal(str(self.quantity)) <= Decimal(str(self.minimum_threshold))
+        super().save(*args, **kwargs)
 
     def is_low_stock(self):
         return self.quantity <= self.minimum_threshold
@@ -227,6 +414,98 @@ class InventoryItem(models.Model):
         return f"{self.name} - {self.quantity} {self.unit}"
 
 
+#  Recipe Component Model
+class RecipeComponent(models.Model):
+    """Stock used by one portion of a menu item."""
+    menu_item = models.ForeignKey('home.MenuItem', on_delete=models.CASCADE, related_name='recipe_components')
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='recipe_components')
+    quantity = models.DecimalField(max_digits=10, decimal_places=3)
+
+    class Meta:
+        unique_together = ['menu_item', 'inventory_item']
+
+    def __str__(self):
+        return f"{self.menu_item.name} - {self.quantity} {self.inventory_item.unit} {self.inventory_item.name}"
+
+
+#  Stock Movement Model
+class StockMovement(models.Model):
+    """Append-only ledger of stock changes; InventoryItem.quantity is their running total."""
+    RECEIPT = 'receipt'
+    USAGE = 'usage'
+    WASTE = 'waste'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (RECEIPT, 'Receipt'),
+        (USAGE, 'Usage'),
+        (WASTE, 'Waste'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    delta = models.DecimalField(max_digits=12, decimal_places=3)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventory_item', 'created_at'], name='stock_movement_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_item.name} {self.kind} {self.delta}"
+
+
+#  Stock Snapshot Model
+class StockSnapshot(models.Model):
+    """Stock level and per-kind totals of ledger movements compacted up to ``taken_at``."""
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.DecimalField(max_digits=12, decimal_places=3)
+    received = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    used = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    wasted = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    adjusted = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    movement_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['inventory_item', 'taken_at']
+
+    def __str__(self):
+        return f"{self.inventory_item.name} @ {self.taken_at}: {self.quantity}"
+
+
+#  Stock Alert Model
+class StockAlert(models.Model):
+    """An item crossing its minimum threshold, stored with the stock change until purchasing acknowledges it."""
+    LOW_STOCK = 'low_stock'
+    RESTOCKED = 'restocked'
+    KIND_CHOICES = [
+        (LOW_STOCK, 'Low stock'),
+        (RESTOCKED, 'Restocked'),
+    ]
+
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='alerts')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.DecimalField(max_digits=12, decimal_places=3)
+    minimum_threshold = models.DecimalField(max_digits=12, decimal_places=3)
+    created_at = models.DateTimeField(auto_now_add=True)
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+    acknowledged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            # unacknowledged alerts in order
+            models.Index(fields=['acknowledged_at', 'id'], name='stock_alert_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_item.name} {self.kind} at {self.quantity}"
+
+
 #  Shift Management Model
 class Shift(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
@@ -0,0 +1,83 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(created_at, pk):
+    """
+    Opaque cursor pointing at a (created_at, id) position.
+    """
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Inverse of encode_cursor(), raises ValueError for malformed cursors.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_queryset(queryset, cursor=None, descending=False):
+    """
+    ``queryset`` ordered by (created_at, id) and narrowed to the rows after
+    ``cursor``. The bound is written as created_at >= c AND (created_at > c
+    OR id > pk) so the database seeks straight to it on a (..., created_at,
+    id) index instead of OR-ing two index scans and sorting the result.
+    """
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(Q(created_at__lte=created_at), Q(created_at__lt=created_at) | Q(id__lt=pk))
+        else:
+            queryset = queryset.filter(Q(created_at__gte=created_at), Q(created_at__gt=created_at) | Q(id__gt=pk))
+    return queryset
+
+
+def keyset_page(queryset, cursor=None, limit=50, descending=False):
+    """
+    Return (rows, next_cursor) for the page of ``queryset`` after ``cursor``,
+    ordered by (created_at, id). Each page is a range scan on an index over
+    those columns, no matter how deep it is.
+    """
+    rows = list(keyset_queryset(queryset, cursor, descending)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+    return rows, next_cursor
+
+
+def merged_keyset_page(querysets, cursor=None, limit=50):
+    """
+    One ascending (created_at, id) page across several querysets, e.g. one
+    per value of an indexed column.
+
+    Each queryset is read as its own LIMIT-ed range scan (a single ORDER BY
+    over "col IN (...)" has to sort every matching row) and the pages are
+    merged in memory.
+    """
+    rows = []
+    more = False
+    for queryset in querysets:
+        page, next_cursor = keyset_page(queryset, cursor, limit)
+        rows.extend(page)
+        more = more or next_cursor is not None
+
+    rows.sort(key=lambda row: (row.created_at, row.pk))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        more = True
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk) if more else None
+    return rows, next_cursor
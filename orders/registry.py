@@ -0,0 +1,96 @@
+import threading
+import time
+
+from .models import OrderStatus, PaymentMethod
+
+
+class LookupRegistry:
+    """
+    Process-wide, in-memory copy of a small lookup table.
+
+    Rows are loaded with one query on first use and served from memory
+    afterwards. post_save/post_delete receivers in orders.signals call
+    invalidate(); ``max_age`` bounds how long another process's edits can
+    stay invisible here.
+    """
+
+    def __init__(self, model, key='name', max_age=300):
+        self.model = model
+        self.key = key
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _load(self):
+        rows = list(self.model.objects.order_by('pk'))
+        cache = {
+            'loaded_at': time.monotonic(),
+            'rows': rows,
+            'by_pk': {row.pk: row for row in rows},
+            'by_key': {getattr(row, self.key): row for row in rows},
+        }
+        self._cache = cache
+        return cache
+
+    def _get_cache(self, reload=False):
+        cache = self._cache
+        if reload or cache is None or time.monotonic() - cache['loaded_at'] > self.max_age:
+            with self._lock:
+                if reload or self._cache is cache:
+                    cache = self._load()
+                else:
+                    cache = self._cache
+        return cache
+
+    def invalidate(self):
+        self._cache = None
+
+    def all(self):
+        return list(self._get_cache()['rows'])
+
+    def _lookup(self, index, value):
+        row = self._get_cache()[index].get(value)
+        if row is None:
+            # the row may have been added by another process, reload once
+            row = self._get_cache(reload=True)[index].get(value)
+        if row is None:
+            raise self.model.DoesNotExist(
+                f"{self.model.__name__} matching {value!r} does not exist."
+            )
+        return row
+
+    def get(self, key):
+        return self._lookup('by_key', key)
+
+    def get_by_pk(self, pk):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise self.model.DoesNotExist(f"{self.model.__name__} matching {pk!r} does not exist.")
+        return self._lookup('by_pk', pk)
+
+
+order_statuses = LookupRegistry(OrderStatus)
+payment_methods = LookupRegistry(PaymentMethod)
+
+
+def get_order_status(name):
+    """
+    Return the OrderStatus with this name, raises OrderStatus.DoesNotExist.
+    """
+    return order_statuses.get(name)
+
+
+def get_payment_method(pk):
+    """
+    Return the active PaymentMethod with this id, or None.
+    """
+    try:
+        method = payment_methods.get_by_pk(pk)
+    except PaymentMethod.DoesNotExist:
+        return None
+    return method if method.is_active else None
+
+
+def active_payment_methods():
+    return [method for method in payment_methods.all() if method.is_active]
@@ -0,0 +1,337 @@
+import heapq
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from home.menu_cache import VersionCounter
+from home.models import MenuItem
+from .models import DailySalesRollup, MenuItemDailySales, Order, OrderItem, OrderSalesRecord
+
+COMPLETED = 'completed'
+CENT = Decimal("0.01")
+# order ids per "order_id IN (...)" lookup, below the SQLite parameter limit
+SNAPSHOT_ORDER_BATCH = 900
+
+# leaderboard windows, in days including today
+TOP_SELLER_WINDOWS = {'today': 1, '7d': 7, '30d': 30}
+TOP_SELLER_METRICS = ('quantity', 'revenue')
+TOP_SELLER_SIZE = 50
+TOP_SELLER_CACHE_TIMEOUT = 60 * 60
+
+top_sellers_version = VersionCounter('orders:top-sellers')
+
+
+def business_date(created_at):
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def start_of_day(day):
+    """
+    First instant of ``day``, so created_at filters stay index range scans
+    instead of created_at__date lookups.
+    """
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def sales_snapshots(orders):
+    """
+    What the rollups hold for each of ``orders`` (id -> total_amount), as
+    stored in OrderSalesRecord.sales: the total, the item count and the
+    (menu_item_id, quantity, revenue) lines. One query per batch of orders.
+    """
+    snapshots = {
+        order_pk: {'total': str(total), 'items': 0, 'lines': []}
+        for order_pk, total in orders.items()
+    }
+    order_ids = list(snapshots)
+    for start in range(0, len(order_ids), SNAPSHOT_ORDER_BATCH):
+        lines = OrderItem.objects.filter(
+            order_id__in=order_ids[start:start + SNAPSHOT_ORDER_BATCH]
+        ).values('order_id', 'menu_item_id').annotate(
+            sold=Sum('quantity'),
+            earned=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        ).order_by('order_id', 'menu_item_id')
+        for line in lines:
+            snapshot = snapshots[line['order_id']]
+            snapshot['items'] += line['sold']
+            snapshot['lines'].append([line['menu_item_id'], line['sold'], str(Decimal(line['earned']).quantize(CENT))])
+    return snapshots
+
+
+def apply_order_sales(day, removed=None, added=None):
+    """
+    Take the ``removed`` snapshot out of the day's rollups and put the
+    ``added`` one in: one UPDATE for the day and one pass over the menu
+    items whose figures changed.
+    """
+    orders, revenue, items, per_item = 0, Decimal("0.00"), 0, {}
+    for sign, sales in ((-1, removed), (1, added)):
+        if sales is None:
+            continue
+        orders += sign
+        revenue += sign * Decimal(sales['total'])
+        items += sign * sales['items']
+        for menu_item_id, sold, earned in sales['lines']:
+            quantity, amount = per_item.get(menu_item_id, (0, Decimal("0.00")))
+            per_item[menu_item_id] = (quantity + sign * sold, amount + sign * Decimal(earned))
+
+    changes = {
+        'order_count': F('order_count') + orders,
+        'gross_revenue': F('gross_revenue') + revenue,
+        'item_count': F('item_count') + items,
+    }
+    if not DailySalesRollup.objects.filter(date=day).update(**changes):
+        DailySalesRollup.objects.get_or_create(date=day)
+        DailySalesRollup.objects.filter(date=day).update(**changes)
+
+    record_menu_item_sales(day, {
+        menu_item_id: change for menu_item_id, change in per_item.items() if change != (0, 0)
+    })
+
+
+def record_order_sales(order_pk):
+    """
+    Bring the rollups in line with one order: take out what was recorded
+    for it, if anything, and add its current lines if it is completed.
+
+    What was added is kept in an OrderSalesRecord, so later edits,
+    cancellation and deletion take out exactly that, not whatever the
+    order holds by then.
+    """
+    from .registry import order_statuses
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_pk).values(
+            'status_id', 'created_at', 'total_amount'
+        ).first()
+        if order is None:
+            return
+        previous = OrderSalesRecord.objects.filter(order_id=order_pk).values_list('sales', flat=True).first()
+
+        status = order_statuses.get_by_pk(order['status_id']) if order['status_id'] else None
+        if status is not None and status.name == COMPLETED:
+            recorded = sales_snapshots({order_pk: order['total_amount']})[order_pk]
+        else:
+            recorded = None
+        if recorded == previous:
+            return
+
+        apply_order_sales(business_date(order['created_at']), previous, recorded)
+        if recorded is None:
+            OrderSalesRecord.objects.filter(order_id=order_pk).delete()
+        else:
+            OrderSalesRecord.objects.update_or_create(order_id=order_pk, defaults={'sales': recorded})
+
+
+def remove_order_sales(order):
+    """
+    Take an order that is about to be deleted out of the rollups.
+    """
+    sales = OrderSalesRecord.objects.filter(order_id=order.pk).values_list('sales', flat=True).first()
+    if sales is not None:
+        apply_order_sales(business_date(order.created_at), removed=sales)
+
+
+def record_menu_item_sales(day, changes):
+    """
+    Apply per-item changes (menu_item_id -> (quantity, revenue)) to the
+    day's per-item sales: one INSERT for missing rows and one UPDATE,
+    whatever the number of items.
+    """
+    if not changes:
+        return
+
+    MenuItemDailySales.objects.bulk_create(
+        [MenuItemDailySales(date=day, menu_item_id=menu_item_id) for menu_item_id in changes],
+        ignore_conflicts=True
+    )
+    MenuItemDailySales.objects.filter(date=day, menu_item_id__in=list(changes)).update(
+        quantity=F('quantity') + Case(
+            *[When(menu_item_id=menu_item_id, then=Value(sold)) for menu_item_id, (sold, earned) in changes.items()],
+            output_field=IntegerField()
+        ),
+        revenue=F('revenue') + Case(
+            *[When(menu_item_id=menu_item_id, then=Value(earned)) for menu_item_id, (sold, earned) in changes.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    )
+
+    update_top_sellers(day, changes)
+
+
+def get_sales_report(start_date, end_date):
+    """
+    Daily rollups between two dates (inclusive), one row per day that had sales.
+    """
+    return list(
+        DailySalesRollup.objects.filter(date__range=(start_date, end_date)).order_by('date')
+    )
+
+
+def rebuild_sales_rollups(start_date=None, end_date=None):
+    """
+    Recompute the daily and per-item rollups from completed orders, for
+    all history or a date range. Returns the number of days written.
+    """
+    from .registry import get_order_status
+
+    completed = get_order_status(COMPLETED)
+    in_range = Order.objects.all()
+    rollups = DailySalesRollup.objects.all()
+    item_rollups = MenuItemDailySales.objects.all()
+    if start_date:
+        in_range = in_range.filter(created_at__gte=start_of_day(start_date))
+        rollups = rollups.filter(date__gte=start_date)
+        item_rollups = item_rollups.filter(date__gte=start_date)
+    if end_date:
+        in_range = in_range.filter(created_at__lt=start_of_day(end_date + timedelta(days=1)))
+        rollups = rollups.filter(date__lte=end_date)
+        item_rollups = item_rollups.filter(date__lte=end_date)
+    orders = in_range.filter(status=completed)
+
+    days = {
+        row['day']: DailySalesRollup(
+            date=row['day'],
+            order_count=row['order_count'],
+            gross_revenue=row['gross_revenue'] or Decimal("0.00")
+        )
+        for row in orders.annotate(day=TruncDate('created_at')).values('day').annotate(
+            order_count=Count('id'), gross_revenue=Sum('total_amount')
+        )
+    }
+    item_sales = [
+        MenuItemDailySales(date=row['day'], menu_item_id=row['menu_item_id'],
+                           quantity=row['sold'], revenue=row['earned'])
+        for row in OrderItem.objects.filter(order__in=orders).annotate(
+            day=TruncDate('order__created_at')
+        ).values('day', 'menu_item_id').annotate(
+            sold=Sum('quantity'),
+            earned=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        )
+    ]
+    for sales in item_sales:
+        if sales.date in days:
+            days[sales.date].item_count += sales.quantity
+
+    # what each order now holds in the rollups, for later edits and deletes
+    records = [
+        OrderSalesRecord(order_id=order_pk, sales=sales)
+        for order_pk, sales in sales_snapshots(dict(orders.values_list('pk', 'total_amount'))).items()
+    ]
+    with transaction.atomic():
+        rollups.delete()
+        item_rollups.delete()
+        OrderSalesRecord.objects.filter(order__in=in_range).delete()
+        DailySalesRollup.objects.bulk_create(days.values())
+        MenuItemDailySales.objects.bulk_create(item_sales)
+        OrderSalesRecord.objects.bulk_create(records, batch_size=500)
+
+    invalidate_top_sellers()
+    return len(days)
+
+
+# ----------------------------------------------------
+# TOP SELLERS
+# ----------------------------------------------------
+def _top_sellers_key(version, window, today):
+    return f"orders:top-sellers:{version}:{today.isoformat()}:{window}"
+
+
+def invalidate_top_sellers():
+    top_sellers_version.bump()
+
+
+def update_top_sellers(day, changes):
+    """
+    Move the cached window totals to the next version in step with a
+    change to the per-item daily sales, instead of rebuilding them.
+
+    Runs in the transaction that changes the sales: the version is bumped
+    there and the cached totals follow once it commits. A window that was
+    not cached at the previous version is left to be built on next use.
+    """
+    previous, version = top_sellers_version.bump()
+    if previous is None:
+        return
+
+    def apply():
+        today = timezone.localdate()
+        for window, days in TOP_SELLER_WINDOWS.items():
+            totals = cache.get(_top_sellers_key(previous, window, today))
+            if totals is None:
+                continue
+            if today - timedelta(days=days - 1) <= day <= today:
+                missing = [menu_item_id for menu_item_id in changes if menu_item_id not in totals]
+                names = dict(MenuItem.objects.filter(pk__in=missing).values_list('pk', 'name')) if missing else {}
+                for menu_item_id, (sold, earned) in changes.items():
+                    name, quantity, revenue = totals.get(menu_item_id, (names.get(menu_item_id), 0, Decimal("0.00")))
+                    totals[menu_item_id] = (name, quantity + sold, revenue + earned)
+            cache.set(_top_sellers_key(version, window, today), totals, TOP_SELLER_CACHE_TIMEOUT)
+
+    transaction.on_commit(apply)
+
+
+def build_top_sellers(window, today=None):
+    """
+    Quantity and revenue of every menu item sold in a window, as
+    menu_item_id -> (name, quantity, revenue), from the per-item daily
+    sales (at most days x items rows, never OrderItem).
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=TOP_SELLER_WINDOWS[window] - 1)
+    rows = MenuItemDailySales.objects.filter(date__range=(start, today)).values(
+        'menu_item_id', 'menu_item__name'
+    ).annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+
+    return {
+        row['menu_item_id']: (row['menu_item__name'], row['total_quantity'], row['total_revenue'])
+        for row in rows
+    }
+
+
+def rank_top_sellers(totals, metric, limit=TOP_SELLER_SIZE):
+    """
+    The ``limit`` best sellers by ``metric`` from window totals.
+    """
+    field = TOP_SELLER_METRICS.index(metric) + 1
+    ranked = heapq.nsmallest(
+        limit,
+        ((menu_item_id, row) for menu_item_id, row in totals.items() if row[1] > 0),
+        key=lambda entry: (-entry[1][field], entry[0])
+    )
+    return [
+        {'menu_item_id': menu_item_id, 'menu_item__name': name, 'quantity': quantity, 'revenue': revenue}
+        for menu_item_id, (name, quantity, revenue) in ranked
+    ]
+
+
+def get_top_sellers(window='7d', metric='quantity', limit=10):
+    """
+    Cached leaderboard of the best-selling menu items.
+
+    The window totals are cached under the top-sellers version, which is
+    kept in the database, so every worker drops totals another worker
+    changed; totals cached here are moved forward by update_top_sellers.
+
+    :param window: 'today', '7d' or '30d'.
+    :param metric: 'quantity' or 'revenue'.
+    """
+    if window not in TOP_SELLER_WINDOWS:
+        raise ValueError(f"Unknown window {window!r}")
+    if metric not in TOP_SELLER_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}")
+
+    today = timezone.localdate()
+    key = _top_sellers_key(top_sellers_version.version(), window, today)
+    totals = cache.get(key)
+    if totals is None:
+        totals = build_top_sellers(window, today)
+        cache.set(key, totals, TOP_SELLER_CACHE_TIMEOUT)
+    return rank_top_sellers(totals, metric, min(limit, TOP_SELLER_SIZE))
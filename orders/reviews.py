@@ -0,0 +1,145 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import CustomerReview, RatingSummary
+from .pagination import keyset_page
+
+# the summary is a single row
+RATING_SUMMARY_PK = 1
+REVIEWS_PAGE_SIZE = 20
+
+
+def rebuild_rating_summary():
+    """
+    Recount the summary from the approved reviews with one aggregate.
+    """
+    totals = CustomerReview.objects.filter(is_approved=True).aggregate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating', default=0),
+        **{f'star_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+    )
+    summary, _ = RatingSummary.objects.update_or_create(pk=RATING_SUMMARY_PK, defaults=totals)
+    return summary
+
+
+def apply_rating_changes(added=(), removed=()):
+    """
+    Add and remove approved ratings from the summary with a single UPDATE.
+    Runs in the caller's transaction, next to the review write itself.
+    """
+    counts = Counter(added)
+    counts.subtract(removed)
+    counts = {stars: count for stars, count in counts.items() if count}
+    if not counts:
+        return
+
+    changes = {f'star_{stars}': F(f'star_{stars}') + count for stars, count in counts.items()}
+    changes['review_count'] = F('review_count') + sum(counts.values())
+    changes['rating_sum'] = F('rating_sum') + sum(stars * count for stars, count in counts.items())
+    if not RatingSummary.objects.filter(pk=RATING_SUMMARY_PK).update(**changes):
+        # first use: the reviews already include this change
+        rebuild_rating_summary()
+
+
+def get_rating_summary():
+    try:
+        return RatingSummary.objects.get(pk=RATING_SUMMARY_PK)
+    except RatingSummary.DoesNotExist:
+        return RatingSummary(pk=RATING_SUMMARY_PK)
+
+
+def approved_reviews_page(cursor=None, limit=REVIEWS_PAGE_SIZE):
+    """
+    Newest approved reviews after ``cursor``, as (reviews, next_cursor).
+    """
+    reviews = CustomerReview.objects.filter(is_approved=True).select_related('order', 'customer')
+    return keyset_page(reviews, cursor=cursor, limit=limit, descending=True)
+
+
+# ---------------------------
+# MODERATION
+# ---------------------------
+MODERATION_BATCH_LIMIT = 1000
+
+
+@lru_cache(maxsize=8)
+def _keyword_pattern(keywords):
+    if not keywords:
+        return None
+    # longest first so overlapping phrases match whole
+    alternatives = sorted({keyword.strip().casefold() for keyword in keywords if keyword.strip()}, key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(map(re.escape, alternatives)) + r')\b', re.IGNORECASE)
+
+
+def flagged_keyword(text):
+    """
+    First settings.REVIEW_FLAG_KEYWORDS keyword (whole words, any case)
+    found in ``text``, or None. The keywords are compiled into a single
+    regular expression once.
+    """
+    pattern = _keyword_pattern(tuple(getattr(settings, 'REVIEW_FLAG_KEYWORDS', ())))
+    if pattern is None or not text:
+        return None
+    match = pattern.search(text)
+    return match.group(0) if match else None
+
+
+def pending_reviews_page(cursor=None, limit=50, flagged_only=False):
+    """
+    Reviews waiting for moderation, oldest first, as (reviews, next_cursor).
+    """
+    reviews = CustomerReview.objects.filter(is_approved=False, is_rejected=False).select_related('order', 'customer')
+    if flagged_only:
+        reviews = reviews.filter(is_flagged=True)
+    return keyset_page(reviews, cursor=cursor, limit=limit)
+
+
+def moderate_reviews(approve=(), reject=()):
+    """
+    Approve and reject reviews in bulk.
+
+    The affected rows are locked and read once, changed with a single
+    UPDATE, and the rating summary is adjusted in the same transaction.
+
+    :return: (approved, rejected) counts of reviews whose state changed.
+    :raises ValidationError: if a review is in both lists or too many are given.
+    """
+    approve, reject = set(approve), set(reject)
+    if approve & reject:
+        raise ValidationError(f"Reviews cannot be both approved and rejected: {sorted(approve & reject)}")
+    if len(approve) + len(reject) > MODERATION_BATCH_LIMIT:
+        raise ValidationError(f"At most {MODERATION_BATCH_LIMIT} reviews can be moderated at once.")
+    if not approve and not reject:
+        return 0, 0
+
+    with transaction.atomic():
+        current = CustomerReview.objects.select_for_update().filter(
+            pk__in=approve | reject
+        ).values_list('pk', 'rating', 'is_approved', 'is_rejected')
+
+        added, removed, changed = [], [], []
+        for pk, rating, is_approved, is_rejected in current:
+            if pk in approve and not is_approved:
+                added.append(rating)
+                changed.append(pk)
+            elif pk in reject and not is_rejected:
+                if is_approved:
+                    removed.append(rating)
+                changed.append(pk)
+
+        if changed:
+            approved_ids = [pk for pk in changed if pk in approve]
+            CustomerReview.objects.filter(pk__in=changed).update(
+                is_approved=Case(When(pk__in=approved_ids, then=Value(True)), default=Value(False)),
+                is_rejected=Case(When(pk__in=approved_ids, then=Value(False)), default=Value(True)),
+                is_flagged=False,
+            )
+            apply_rating_changes(added=added, removed=removed)
+
+    return len(added), len(changed) - len(added)
@@ -1,7 +1,10 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Order, OrderItem, Coupon, PaymentMethod, LoyaltyProgram, NutritionalInfo, Ingredient, Contact
+from .models import Order, OrderItem, Coupon, PaymentMethod, LoyaltyProgram, NutritionalInfo, Ingredient, Contact, CustomerReview
 from home.models import MenuItem
 from home.serializers import MenuItemSerializer
+from .reviews import MODERATION_BATCH_LIMIT
+from .services import place_order
 
 class OrderItemSerializer(serializers.ModelSerializer):
     menu_item_detail = MenuItemSerializer(source='menu_item', read_only=True)
@@ -10,23 +13,37 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['id','menu_item','menu_item_detail','quantity','price']
 
+class OrderLineSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, read_only=True)
+    items = OrderItemSerializer(source='orderitem_set', many=True, read_only=True)
+    order_items = OrderLineSerializer(many=True, write_only=True, required=False)
     status_name = serializers.CharField(source='status.name', read_only=True)
-    total_amount = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'order_id', 'customer_name', 'created_at', 'status', 'status_name', 'total_amount', 'items']
-        read_only_fields = ['order_id']
-
-    def get_total_amount(self, obj):
-        return obj.calculate_total()
+        fields = ['id', 'order_id', 'customer_name', 'created_at', 'status', 'status_name', 'total_amount', 'items', 'order_items']
+        read_only_fields = ['order_id', 'total_amount']
 
     def create(self, validated_data):
-        # Note: items are handled separately through a custom endpoint
-        # For now, just create the order without items
-        return Order.objects.create(**validated_data)
+        lines = validated_data.pop('order_items', None)
+        if not lines:
+            return Order.objects.create(**validated_data)
+
+        quantities = {}
+        for line in lines:
+            quantities[line['menu_item']] = quantities.get(line['menu_item'], 0) + line['quantity']
+
+        try:
+            return place_order(
+                validated_data['user'],
+                validated_data['customer_name'],
+                quantities
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'order_items': e.messages})
 
 
 # Coupon Serializer
@@ -36,6 +53,27 @@ class CouponSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+# most coupons one API request creates; larger campaigns use the generate_coupons command
+COUPON_CAMPAIGN_API_LIMIT = 5000
+
+
+# Coupon Campaign Serializer
+class CouponCampaignSerializer(serializers.Serializer):
+    count = serializers.IntegerField(min_value=1, max_value=COUPON_CAMPAIGN_API_LIMIT, error_messages={
+        'max_value': f"At most {COUPON_CAMPAIGN_API_LIMIT} coupons per request; "
+                     "use the generate_coupons management command for larger campaigns."
+    })
+    discount_percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
+    valid_from = serializers.DateField()
+    valid_until = serializers.DateField()
+    length = serializers.IntegerField(min_value=6, max_value=50, default=10)
+
+    def validate(self, data):
+        if data['valid_until'] < data['valid_from']:
+            raise serializers.ValidationError("valid_until must not be before valid_from.")
+        return data
+
+
 # Payment Method Serializer
 class PaymentMethodSerializer(serializers.ModelSerializer):
     class Meta:
@@ -57,6 +95,17 @@ class NutritionalInfoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+# Nutrition Totals Request Serializer
+class NutritionTotalsSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=5000)
+    items = OrderLineSerializer(many=True, required=False)
+
+    def validate(self, data):
+        if bool(data.get('order_ids')) == bool(data.get('items')):
+            raise serializers.ValidationError("Provide either order_ids or items.")
+        return data
+
+
 # Ingredient Serializer
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -70,3 +119,30 @@ class ContactSerializer(serializers.ModelSerializer):
         model = Contact
         fields = '__all__'
         read_only_fields = ['created_at', 'is_resolved']
+
+
+# Review Moderation Serializers
+class PendingReviewSerializer(serializers.ModelSerializer):
+    order_id = serializers.CharField(source='order.order_id', read_only=True)
+    customer = serializers.CharField(source='customer.username', read_only=True)
+
+    class Meta:
+        model = CustomerReview
+        fields = ['id', 'order_id', 'customer', 'rating', 'review_text', 'created_at', 'is_flagged']
+
+
+class ReviewModerationSerializer(serializers.Serializer):
+    approve = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                    max_length=MODERATION_BATCH_LIMIT)
+    reject = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                   max_length=MODERATION_BATCH_LIMIT)
+
+    def validate(self, data):
+        if not data['approve'] and not data['reject']:
+            raise serializers.ValidationError("Give reviews to approve or reject.")
+        both = set(data['approve']) & set(data['reject'])
+        if both:
+            raise serializers.ValidationError(f"Reviews cannot be both approved and rejected: {sorted(both)}")
+        if len(set(data['approve'])) + len(set(data['reject'])) > MODERATION_BATCH_LIMIT:
+            raise serializers.ValidationError(f"At most {MODERATION_BATCH_LIMIT} reviews can be moderated at once.")
+        return data
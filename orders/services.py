@@ -0,0 +1,226 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Prefetch, Q, Sum, prefetch_related_objects
+
+from home.models import MenuItem
+from .models import Coupon, NutritionalInfo, Order, OrderItem, OrderStatus
+from .inventory import consume_stock
+from .pagination import merged_keyset_page
+from .registry import get_order_status
+from .utility import generate_coupon_codes
+
+# codes per "code IN (...)" lookup, below the SQLite parameter limit
+COUPON_LOOKUP_BATCH = 900
+
+
+def place_order(user, customer_name, quantities, status_name='pending'):
+    """
+    Create an order and all of its items in a single transaction, and
+    take the stock its recipes use.
+
+    :param quantities: mapping of menu item id -> quantity. Lines with a
+        quantity of zero or less are ignored.
+    :return: the created Order.
+    :raises ValidationError: if no valid line is given or a menu item
+        does not exist.
+    """
+    lines = {}
+    for item_id, qty in quantities.items():
+        qty = int(qty)
+        if qty > 0:
+            lines[int(item_id)] = lines.get(int(item_id), 0) + qty
+
+    if not lines:
+        raise ValidationError("Please select valid quantities for items.")
+
+    # one query for every selected menu item
+    menu_items = MenuItem.objects.in_bulk(list(lines))
+    missing = set(lines) - set(menu_items)
+    if missing:
+        raise ValidationError(f"Unknown menu items: {sorted(missing)}")
+
+    status = get_order_status(status_name)
+
+    # bulk_create skips the OrderItem signals, so store the total up front
+    total = sum(
+        (menu_items[item_id].price * qty for item_id, qty in lines.items()),
+        Decimal("0.00")
+    )
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            customer_name=customer_name,
+            status=status,
+            total_amount=total
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=menu_items[item_id],
+                quantity=qty,
+                price=menu_items[item_id].price
+            )
+            for item_id, qty in lines.items()
+        ])
+        consume_stock(order, lines)
+
+    return order
+
+
+def create_coupon_campaign(count, discount_percentage, valid_from, valid_until,
+                           length=10, chunk_size=5000, progress=None):
+    """
+    Create ``count`` coupons with unique random codes.
+
+    Codes are generated in memory, checked against existing coupons with
+    set-based ``code IN (...)`` lookups and inserted with bulk_create, one
+    transaction per chunk.
+
+    :param progress: optional callable(created, count) invoked after each chunk.
+    :return: list of the created coupon codes.
+    """
+    created = []
+    seen = set()
+
+    while len(created) < count:
+        wanted = min(chunk_size, count - len(created))
+        chunk = generate_coupon_codes(wanted, length, exclude=seen)
+        seen.update(chunk)
+
+        # drop codes that already exist; they are replaced in the next round
+        taken = set()
+        for start in range(0, len(chunk), COUPON_LOOKUP_BATCH):
+            batch = chunk[start:start + COUPON_LOOKUP_BATCH]
+            taken.update(Coupon.objects.filter(code__in=batch).values_list('code', flat=True))
+        chunk = [code for code in chunk if code not in taken]
+
+        with transaction.atomic():
+            Coupon.objects.bulk_create(
+                [
+                    Coupon(
+                        code=code,
+                        discount_percentage=discount_percentage,
+                        valid_from=valid_from,
+                        valid_until=valid_until
+                    )
+                    for code in chunk
+                ]
+            )
+        created.extend(chunk)
+
+        if progress is not None:
+            progress(len(created), count)
+
+    return created
+
+
+KITCHEN_STATUSES = ('pending', 'processing')
+
+
+def get_kitchen_board(cursor=None, limit=50):
+    """
+    One page of open orders for the kitchen board plus per-status counts.
+
+    Counts come from a single conditional aggregate, the page is merged
+    from one keyset page on (created_at, id) per status, each an index range
+    scan with no sort, and items are prefetched in one query, so the cost
+    does not grow with the size of the backlog.
+    """
+    status_ids = {}
+    for name in KITCHEN_STATUSES:
+        try:
+            status_ids[name] = get_order_status(name).pk
+        except OrderStatus.DoesNotExist:
+            pass
+
+    open_orders = Order.objects.filter(status_id__in=status_ids.values())
+
+    counts = open_orders.aggregate(**{
+        f'{name}_count': Count('id', filter=Q(status_id=status_id))
+        for name, status_id in status_ids.items()
+    }) if status_ids else {}
+
+    # one LIMIT-ed range scan of (status, created_at, id) per status, merged here
+    orders, next_cursor = merged_keyset_page(
+        [Order.objects.filter(status_id=status_id).select_related('status') for status_id in status_ids.values()],
+        cursor=cursor,
+        limit=limit
+    )
+    prefetch_related_objects(
+        orders, Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('menu_item').order_by('id'))
+    )
+
+    board = {f'{name}_count': counts.get(f'{name}_count', 0) for name in KITCHEN_STATUSES}
+    board.update({'orders': orders, 'next_cursor': next_cursor})
+    return board
+
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+# order ids per "order_id IN (...)" aggregate
+NUTRITION_ORDER_BATCH = 900
+
+
+def _empty_nutrition():
+    return {'calories': 0, 'protein': Decimal("0.00"), 'carbs': Decimal("0.00"), 'fat': Decimal("0.00")}
+
+
+def _add_nutrition(total, values):
+    for nutrient in NUTRIENTS:
+        total[nutrient] += values[nutrient] or 0
+
+
+def nutrition_totals_for_orders(order_ids, user=None):
+    """
+    Calories and macros per order, summed in the database: one grouped
+    aggregate per batch of orders, whatever the number of items.
+
+    :param user: if given, only this user's orders are included.
+    :return: (per_order, total) where per_order maps order id -> totals.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    per_order = {}
+    total = _empty_nutrition()
+    total['missing_items'] = 0
+
+    nutrition = 'menu_item__nutritionalinfo__'
+    macro = DecimalField(max_digits=12, decimal_places=2)
+    for start in range(0, len(order_ids), NUTRITION_ORDER_BATCH):
+        items = OrderItem.objects.filter(order_id__in=order_ids[start:start + NUTRITION_ORDER_BATCH])
+        if user is not None:
+            items = items.filter(order__user=user)
+        rows = items.values('order_id').annotate(
+            calories=Sum(F('quantity') * F(nutrition + 'calories'), output_field=IntegerField()),
+            protein=Sum(F('quantity') * F(nutrition + 'protein'), output_field=macro),
+            carbs=Sum(F('quantity') * F(nutrition + 'carbs'), output_field=macro),
+            fat=Sum(F('quantity') * F(nutrition + 'fat'), output_field=macro),
+            missing_items=Count('id', filter=Q(menu_item__nutritionalinfo__isnull=True)),
+        )
+        for row in rows:
+            totals = _empty_nutrition()
+            _add_nutrition(totals, row)
+            totals['missing_items'] = row['missing_items']
+            per_order[row['order_id']] = totals
+            _add_nutrition(total, totals)
+            total['missing_items'] += row['missing_items']
+
+    return per_order, total
+
+
+def nutrition_totals_for_cart(quantities):
+    """
+    Calories and macros for a cart of {menu item id: quantity}, from one
+    query over the nutrition rows.
+    """
+    total = _empty_nutrition()
+    rows = NutritionalInfo.objects.filter(menu_item_id__in=list(quantities)).values('menu_item_id', *NUTRIENTS)
+    found = set()
+    for row in rows:
+        qty = quantities[row['menu_item_id']]
+        found.add(row['menu_item_id'])
+        _add_nutrition(total, {nutrient: row[nutrient] * qty for nutrient in NUTRIENTS})
+    total['missing_items'] = len(set(quantities) - found)
+    return total
@@ -0,0 +1,246 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from home.menu_cache import menu_snapshots
+from .models import (
+    CustomerReview, Ingredient, InventoryItem, Order, OrderItem, OrderSalesRecord, OrderStatus, PaymentMethod
+)
+from .events import get_event_bus, order_event
+from .inventory import order_quantities, publish_stock_alerts, restock_order
+from .registry import order_statuses, payment_methods
+from .reports import COMPLETED, record_order_sales, remove_order_sales
+from .reviews import apply_rating_changes, flagged_keyword
+
+CANCELLED = 'cancelled'
+
+
+# ----------------------------------------------------
+# ORDER TOTALS
+# ----------------------------------------------------
+def line_total(item):
+    return Decimal(str(item.price)) * item.quantity
+
+
+@receiver(post_save, sender=OrderItem)
+def add_item_to_order_total(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        Order.objects.filter(pk=instance.order_id).update(
+            total_amount=F('total_amount') + line_total(instance)
+        )
+    else:
+        # the previous price/quantity is unknown, recompute this order only
+        Order.objects.recalculate_totals(pk=instance.order_id)
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_item_from_order_total(sender, instance, **kwargs):
+    Order.objects.filter(pk=instance.order_id).update(
+        total_amount=F('total_amount') - line_total(instance)
+    )
+
+
+# ----------------------------------------------------
+# LOOKUP REGISTRIES
+# ----------------------------------------------------
+@receiver(post_save, sender=OrderStatus)
+@receiver(post_delete, sender=OrderStatus)
+def invalidate_order_statuses(sender, **kwargs):
+    order_statuses.invalidate()
+
+
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+def invalidate_payment_methods(sender, **kwargs):
+    payment_methods.invalidate()
+
+
+# ----------------------------------------------------
+# MENU CACHE (ingredients are part of the menu snapshot)
+# ----------------------------------------------------
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_menu_version_for_ingredients(sender, **kwargs):
+    menu_snapshots.bump()
+
+
+# ----------------------------------------------------
+# KITCHEN EVENTS
+# ----------------------------------------------------
+def status_name(status_id):
+    if status_id is None:
+        return None
+    try:
+        return order_statuses.get_by_pk(status_id).name
+    except OrderStatus.DoesNotExist:
+        return None
+
+
+def publish_order_event(order, created):
+    def publish():
+        if created:
+            # items are written after the order row, read them once committed
+            items = list(OrderItem.objects.filter(order_id=order.pk).values('menu_item__name', 'quantity'))
+            event = order_event('order.created', order, status_name(order.status_id), [
+                {'name': item['menu_item__name'], 'quantity': item['quantity']} for item in items
+            ])
+        else:
+            event = order_event('order.status_changed', order, status_name(order.status_id))
+        get_event_bus().publish(event)
+
+    transaction.on_commit(publish)
+
+
+# ----------------------------------------------------
+# DAILY SALES ROLLUPS
+# ----------------------------------------------------
+def update_sales_rollup(order, previous_status_id):
+    was_completed = status_name(previous_status_id) == COMPLETED
+    is_completed = status_name(order.status_id) == COMPLETED
+    if was_completed == is_completed:
+        return
+
+    # run after commit so the order's items are in place
+    transaction.on_commit(lambda: record_order_sales(order.pk))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_recorded_order_sales(sender, instance, raw=False, **kwargs):
+    # lines of an order already in the rollups changed: re-record it
+    if raw:
+        return
+    if OrderSalesRecord.objects.filter(order_id=instance.order_id).exists():
+        transaction.on_commit(lambda: record_order_sales(instance.order_id))
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_order_sales(sender, instance, **kwargs):
+    # before the cascade removes the record of what the rollups hold
+    remove_order_sales(instance)
+
+
+# ----------------------------------------------------
+# STOCK (orders take it in orders.services.place_order)
+# ----------------------------------------------------
+def deleting_order(origin):
+    return isinstance(origin, Order) or getattr(origin, 'model', None) is Order
+
+
+def restock(order, note):
+    if status_name(order.status_id) == CANCELLED:
+        restock_order(order, {}, note)
+    else:
+        restock_order(order, order_quantities(order.pk), note)
+
+
+def update_order_stock(order, previous_status_id):
+    was_cancelled = status_name(previous_status_id) == CANCELLED
+    is_cancelled = status_name(order.status_id) == CANCELLED
+    if was_cancelled != is_cancelled:
+        restock(order, f"Order {order.order_id} {'cancelled' if is_cancelled else 'reopened'}")
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_stock(sender, instance, raw=False, origin=None, **kwargs):
+    # a deleted order puts its stock back in one go, see restock_deleted_order
+    if raw or deleting_order(origin):
+        return
+    order = instance.order
+    restock(order, f"Order {order.order_id} edited")
+
+
+@receiver(pre_delete, sender=Order)
+def restock_deleted_order(sender, instance, **kwargs):
+    # a completed order's ingredients were used; deleting it later is only cleanup
+    if status_name(instance.status_id) != COMPLETED:
+        restock_order(instance, {}, f"Order {instance.order_id} deleted")
+
+
+# ----------------------------------------------------
+# ORDER STATUS CHANGES
+# ----------------------------------------------------
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    previous_status_id = getattr(instance, '_loaded_status_id', None)
+    instance._loaded_status_id = instance.status_id
+    if raw:
+        return
+    if not created and instance.status_id == previous_status_id:
+        return
+
+    publish_order_event(instance, created)
+    update_sales_rollup(instance, previous_status_id)
+    update_order_stock(instance, previous_status_id)
+
+
+# ----------------------------------------------------
+# LOW-STOCK ALERTS (saves outside the stock ledger)
+# ----------------------------------------------------
+@receiver(post_save, sender=InventoryItem)
+def inventory_item_saved(sender, instance, created, raw=False, **kwargs):
+    was_low = getattr(instance, '_loaded_low_stock', False) or False
+    instance._loaded_low_stock = instance.low_stock
+    if raw or instance.low_stock == was_low:
+        return
+
+    item = {field: getattr(instance, field) for field in ('id', 'name', 'quantity', 'unit', 'minimum_threshold')}
+    publish_stock_alerts([item], {instance.id: instance.low_stock})
+
+
+# ----------------------------------------------------
+# RATING SUMMARY
+# ----------------------------------------------------
+@receiver(pre_save, sender=CustomerReview)
+def hold_flagged_review(sender, instance, raw=False, **kwargs):
+    # new reviews that match a moderation keyword wait in the queue
+    if raw or not instance._state.adding:
+        return
+    if flagged_keyword(instance.review_text):
+        instance.is_flagged = True
+        instance.is_approved = False
+
+
+def locked_rating(review):
+    # what the summary counted for ``review``, read under a row lock so two
+    # concurrent edits cannot both apply a delta from the same loaded value
+    stored = CustomerReview.objects.select_for_update().filter(pk=review.pk).values_list('is_approved', 'rating')
+    return stored.first() or (False, None)
+
+
+@receiver(pre_save, sender=CustomerReview)
+def lock_saved_review(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._loaded_rating = locked_rating(instance)
+
+
+@receiver(pre_delete, sender=CustomerReview)
+def lock_deleted_review(sender, instance, **kwargs):
+    instance._loaded_rating = locked_rating(instance)
+
+
+@receiver(post_save, sender=CustomerReview)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    was_approved, old_rating = getattr(instance, '_loaded_rating', (False, None))
+    instance._loaded_rating = (instance.is_approved, int(instance.rating))
+    if raw:
+        return
+
+    apply_rating_changes(
+        added=[int(instance.rating)] if instance.is_approved else [],
+        removed=[old_rating] if was_approved else []
+    )
+
+
+@receiver(post_delete, sender=CustomerReview)
+def review_deleted(sender, instance, **kwargs):
+    was_approved, old_rating = getattr(instance, '_loaded_rating', (instance.is_approved, instance.rating))
+    if was_approved:
+        apply_rating_changes(removed=[int(old_rating)])
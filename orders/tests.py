@@ -1,9 +1,33 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from .models import Order, OrderStatus, Contact
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.db.models import F
+from home.models import CacheVersion, MenuCategory, MenuItem
+from .models import Order, OrderItem, OrderStatus, Contact, Coupon, DailySalesRollup, DailySpecial, NutritionalInfo
+from .models import InventoryItem, RecipeComponent, StockMovement, StockSnapshot, CustomerReview, MenuItemDailySales
+from .models import OrderIdNode, StockAlert
+from .reports import get_top_sellers, top_sellers_version
+from .reviews import REVIEWS_PAGE_SIZE, approved_reviews_page, get_rating_summary, rebuild_rating_summary
+from .inventory import compact_stock_ledger, record_stock_movement
+from .forecasting import forecast_reorders, np
+from .services import place_order, create_coupon_campaign, get_kitchen_board
+from .events import get_alert_bus, get_event_bus
+from .registry import get_order_status
+from .views import event_stream_response
+from .utility import (
+    OrderIdGenerator, allocate_order_ids, daily_special_index, get_daily_sales_total, get_daily_special, top_selling_menu_items
+)
 
 
 class RestaurantAPITestCase(APITestCase):
@@ -70,3 +94,869 @@ class RestaurantAPITestCase(APITestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.username, 'updateduser')
         self.assertEqual(self.user.email, 'updated@example.com')
+
+    def test_place_order_api(self):
+        """Test placing an order with items through the API"""
+        self.client.force_authenticate(user=self.user)
+        category = MenuCategory.objects.create(name='Drinks')
+        coffee = MenuItem.objects.create(name='Coffee', category=category, price='50.00')
+        juice = MenuItem.objects.create(name='Juice', category=category, price='60.00')
+
+        order_data = {
+            'customer_name': 'Test Customer',
+            'order_items': [
+                {'menu_item': coffee.id, 'quantity': 3},
+                {'menu_item': juice.id, 'quantity': 1},
+            ]
+        }
+
+        response = self.client.post('/api/orders/order/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get()
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(order.status, self.pending_status)
+        self.assertEqual(order.orderitem_set.count(), 2)
+
+    def test_order_history_query_count_is_constant(self):
+        """Test order history does not issue queries per order"""
+        self.client.force_authenticate(user=self.user)
+        category = MenuCategory.objects.create(name='Drinks')
+        coffee = MenuItem.objects.create(name='Coffee', category=category, price='50.00')
+        juice = MenuItem.objects.create(name='Juice', category=category, price='60.00')
+
+        def history_queries(order_count):
+            for i in range(order_count):
+                place_order(self.user, f'Customer {i}', {coffee.id: 1, juice.id: 2})
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/orders/order/history/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data[0]['items']), 2)
+            return len(ctx.captured_queries)
+
+        few = history_queries(2)
+        many = history_queries(20)
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 3)
+
+
+class OrderPlacementTestCase(TestCase):
+    def setUp(self):
+        # lease this process's order ID node, so query counts cover the order alone
+        allocate_order_ids(1)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        OrderStatus.objects.create(name='pending')
+        category = MenuCategory.objects.create(name='Main Course')
+        self.menu_items = [
+            MenuItem.objects.create(name=f'Dish {i}', category=category, price='10.00')
+            for i in range(10)
+        ]
+
+    def test_place_order_uses_fixed_number_of_queries(self):
+        """Test a ten-line order does not issue a query per line"""
+        quantities = {item.id: 2 for item in self.menu_items}
+
+        with self.assertNumQueries(8):
+            order = place_order(self.user, 'Test Customer', quantities)
+
+        self.assertEqual(order.orderitem_set.count(), 10)
+
+    def test_place_order_decrements_stock_from_recipes(self):
+        """Test recipe stock is taken with one UPDATE, whatever the line count"""
+        flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='50.00',
+                                             unit='kg', minimum_threshold='5.00')
+        oil = InventoryItem.objects.create(name='Oil', category='ingredients', quantity='10.00',
+                                           unit='l', minimum_threshold='1.00')
+        for item in self.menu_items:
+            RecipeComponent.objects.create(menu_item=item, inventory_item=flour, quantity='0.250')
+        RecipeComponent.objects.create(menu_item=self.menu_items[0], inventory_item=oil, quantity='0.100')
+
+        quantities = {item.id: 2 for item in self.menu_items}
+        with self.assertNumQueries(11):
+            order = place_order(self.user, 'Test Customer', quantities)
+
+        flour.refresh_from_db()
+        oil.refresh_from_db()
+        self.assertEqual(flour.quantity, Decimal('45.00'))
+        self.assertEqual(oil.quantity, Decimal('9.80'))
+        self.assertEqual(
+            sorted(order.stock_movements.values_list('inventory_item__name', 'kind', 'delta')),
+            [('Flour', 'usage', Decimal('-5.000')), ('Oil', 'usage', Decimal('-0.200'))]
+        )
+
+    def test_edits_cancellation_and_deletion_put_stock_back(self):
+        """Test stock taken by an order follows its lines and returns when it is cancelled or deleted"""
+        OrderStatus.objects.create(name='cancelled')
+        flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='50.000',
+                                             unit='kg', minimum_threshold='5.000')
+        RecipeComponent.objects.create(menu_item=self.menu_items[0], inventory_item=flour, quantity='0.125')
+
+        def level():
+            flour.refresh_from_db()
+            return flour.quantity
+
+        order = place_order(self.user, 'First', {self.menu_items[0].id: 4})
+        self.assertEqual(level(), Decimal('49.500'))
+
+        item = order.orderitem_set.get()
+        item.quantity = 1
+        item.save()
+        self.assertEqual(level(), Decimal('49.875'))
+
+        order.status = get_order_status('cancelled')
+        order.save()
+        self.assertEqual(level(), Decimal('50.000'))
+
+        second = place_order(self.user, 'Second', {self.menu_items[0].id: 2})
+        self.assertEqual(level(), Decimal('49.750'))
+        second.delete()
+        self.assertEqual(level(), Decimal('50.000'))
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('delta', 'note')),
+            [(Decimal('-0.500'), f'Order {order.order_id}'),
+             (Decimal('0.375'), f'Order {order.order_id} edited'),
+             (Decimal('0.125'), f'Order {order.order_id} cancelled'),
+             (Decimal('-0.250'), f'Order {second.order_id}'),
+             (Decimal('0.250'), f'Order {second.order_id} deleted')]
+        )
+
+    def test_restocking_follows_the_order_record_not_the_ledger(self):
+        """Test compaction, untracked orders and completed deletions leave stock right"""
+        OrderStatus.objects.create(name='cancelled')
+        OrderStatus.objects.create(name='completed')
+        flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='100.000',
+                                             unit='kg', minimum_threshold='5.000')
+        RecipeComponent.objects.create(menu_item=self.menu_items[0], inventory_item=flour, quantity='1.000')
+
+        def level():
+            flour.refresh_from_db()
+            return flour.quantity
+
+        order = place_order(self.user, 'First', {self.menu_items[0].id: 5})
+        compact_stock_ledger(timezone.now() + timedelta(seconds=1))
+        item = order.orderitem_set.get()
+        item.quantity = 6
+        item.save()
+        self.assertEqual(level(), Decimal('94.000'))
+        order.status = get_order_status('cancelled')
+        order.save()
+        self.assertEqual(level(), Decimal('100.000'))
+
+        # placed before orders kept a stock record: what it took is unknown
+        untracked = Order.objects.create(user=self.user, customer_name='Old', status=get_order_status('pending'))
+        line = OrderItem.objects.create(order=untracked, menu_item=self.menu_items[0], quantity=3, price='10.00')
+        line.quantity = 4
+        line.save()
+        untracked.status = get_order_status('cancelled')
+        untracked.save()
+        self.assertEqual(level(), Decimal('100.000'))
+
+        completed = place_order(self.user, 'Done', {self.menu_items[0].id: 2})
+        completed.status = get_order_status('completed')
+        completed.save()
+        completed.delete()
+        self.assertEqual(level(), Decimal('98.000'))
+
+    def test_place_order_rolls_back_on_failure(self):
+        """Test a failure while inserting items leaves no partial order"""
+        quantities = {item.id: 1 for item in self.menu_items}
+
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                place_order(self.user, 'Test Customer', quantities)
+
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_total_follows_item_changes(self):
+        """Test the stored order total is kept in sync with its items"""
+        order = place_order(self.user, 'Test Customer', {self.menu_items[0].id: 2})
+        self.assertEqual(order.total_amount, Decimal('20.00'))
+
+        item = OrderItem.objects.create(order=order, menu_item=self.menu_items[1], quantity=1, price='10.00')
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('30.00'))
+
+        item.quantity = 3
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('50.00'))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('20.00'))
+
+        Order.objects.filter(pk=order.pk).update(total_amount=0)
+        call_command('backfill_order_totals', stdout=mock.MagicMock())
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('20.00'))
+
+
+class DailySalesRollupTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        for name in ['pending', 'completed', 'cancelled']:
+            OrderStatus.objects.create(name=name)
+        category = MenuCategory.objects.create(name='Drinks')
+        self.coffee = MenuItem.objects.create(name='Coffee', category=category, price='50.00')
+
+    def set_status(self, order, name):
+        order.status = get_order_status(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def test_rollup_follows_completion_and_cancellation(self):
+        """Test completing and cancelling orders updates the daily rollup"""
+        first = place_order(self.user, 'First', {self.coffee.id: 2})
+        second = place_order(self.user, 'Second', {self.coffee.id: 1})
+        today = first.created_at.date()
+
+        self.set_status(first, 'completed')
+        self.set_status(second, 'completed')
+        self.assertEqual(get_daily_sales_total(today), Decimal('150.00'))
+
+        self.set_status(second, 'cancelled')
+        rollup = DailySalesRollup.objects.get(date=today)
+        self.assertEqual((rollup.order_count, rollup.gross_revenue, rollup.item_count), (1, Decimal('100.00'), 2))
+
+        DailySalesRollup.objects.all().delete()
+        call_command('rebuild_sales_rollups', stdout=mock.MagicMock())
+        rollup = DailySalesRollup.objects.get(date=today)
+        self.assertEqual((rollup.order_count, rollup.gross_revenue, rollup.item_count), (1, Decimal('100.00'), 2))
+
+    def test_edits_and_deletion_take_out_what_was_recorded(self):
+        """Test editing or deleting a completed order keeps the rollups in step"""
+        cake = MenuItem.objects.create(name='Cake', category=self.coffee.category, price='200.00')
+        order = place_order(self.user, 'First', {self.coffee.id: 2})
+        self.set_status(order, 'completed')
+        today = order.created_at.date()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.orderitem_set.all().delete()
+            OrderItem.objects.create(order=order, menu_item=cake, quantity=1, price=cake.price)
+        rollup = DailySalesRollup.objects.get(date=today)
+        self.assertEqual((rollup.order_count, rollup.gross_revenue, rollup.item_count), (1, Decimal('200.00'), 1))
+        self.assertEqual(
+            dict(MenuItemDailySales.objects.filter(date=today).values_list('menu_item__name', 'revenue')),
+            {'Coffee': Decimal('0.00'), 'Cake': Decimal('200.00')}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=order.pk).delete()
+        rollup = DailySalesRollup.objects.get(date=today)
+        self.assertEqual((rollup.order_count, rollup.gross_revenue, rollup.item_count), (0, Decimal('0.00'), 0))
+        self.assertEqual(MenuItemDailySales.objects.get(date=today, menu_item=cake).quantity, 0)
+
+    def test_top_sellers_rank_by_quantity_and_revenue(self):
+        """Test the top-sellers leaderboard counts quantities and is cached"""
+        cake = MenuItem.objects.create(name='Cake', category=self.coffee.category, price='200.00')
+        self.set_status(place_order(self.user, 'First', {self.coffee.id: 3}), 'completed')
+        self.set_status(place_order(self.user, 'Second', {cake.id: 1}), 'completed')
+        place_order(self.user, 'Still pending', {cake.id: 5})
+
+        response = self.client.get('/api/orders/top-sellers/', {'window': 'today'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['menu_item__name'], row['quantity']) for row in response.data['results']],
+                         [('Coffee', 3), ('Cake', 1)])
+
+        top_selling_menu_items(window='today', metric='revenue')
+        with self.assertNumQueries(0):
+            by_revenue = top_selling_menu_items(window='today', metric='revenue')
+        self.assertEqual([row['menu_item__name'] for row in by_revenue], ['Cake', 'Coffee'])
+
+    def test_cached_top_sellers_follow_sales_without_rebuilding(self):
+        """Test new sales update the cached totals and another worker's change drops them"""
+        cake = MenuItem.objects.create(name='Cake', category=self.coffee.category, price='200.00')
+        self.set_status(place_order(self.user, 'First', {self.coffee.id: 1}), 'completed')
+        get_top_sellers('today')
+
+        self.set_status(place_order(self.user, 'Second', {cake.id: 2}), 'completed')
+        with CaptureQueriesContext(connection) as queries:
+            board = get_top_sellers('today')
+        self.assertFalse(any('orders_menuitemdailysales' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual([(row['menu_item__name'], row['quantity']) for row in board], [('Cake', 2), ('Coffee', 1)])
+
+        # another worker's change only shows up as a new version
+        MenuItemDailySales.objects.filter(menu_item=cake).update(quantity=0)
+        CacheVersion.objects.filter(name='orders:top-sellers').update(version=F('version') + 1)
+        with mock.patch.object(top_sellers_version, 'max_age', 0):
+            board = get_top_sellers('today')
+        self.assertEqual([row['menu_item__name'] for row in board], ['Coffee'])
+
+
+class KitchenBoardTestCase(TestCase):
+    def test_board_pages_open_orders_with_constant_queries(self):
+        """Test the kitchen board counts by status and pages with a cursor"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        for name in ['pending', 'processing', 'completed']:
+            OrderStatus.objects.create(name=name)
+        category = MenuCategory.objects.create(name='Drinks')
+        coffee = MenuItem.objects.create(name='Coffee', category=category, price='50.00')
+
+        for i in range(5):
+            place_order(user, f'Pending {i}', {coffee.id: 1})
+        for i in range(3):
+            place_order(user, f'Processing {i}', {coffee.id: 1}, status_name='processing')
+        place_order(user, 'Done', {coffee.id: 1}, status_name='completed')
+
+        get_order_status('pending')
+        get_order_status('processing')
+        with self.assertNumQueries(4):
+            board = get_kitchen_board(limit=4)
+            names = [item.menu_item.name for o in board['orders'] for item in o.orderitem_set.all()]
+
+        self.assertEqual(board['pending_count'], 5)
+        self.assertEqual(board['processing_count'], 3)
+        self.assertEqual(names, ['Coffee'] * 4)
+
+        second = get_kitchen_board(cursor=board['next_cursor'], limit=4)
+        self.assertIsNone(second['next_cursor'])
+        seen = [o.customer_name for o in board['orders'] + second['orders']]
+        self.assertEqual(len(set(seen)), 8)
+        self.assertNotIn('Done', seen)
+
+        # every page read is an index range scan, none sorts the backlog
+        for cursor in (None, board['next_cursor']):
+            with CaptureQueriesContext(connection) as queries:
+                get_kitchen_board(cursor=cursor, limit=4)
+            pages = [q['sql'] for q in queries.captured_queries
+                     if 'ORDER BY "orders_order"."created_at"' in q['sql']]
+            self.assertEqual(len(pages), 2)
+            for sql in pages:
+                with connection.cursor() as db_cursor:
+                    db_cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = ' '.join(str(row[-1]) for row in db_cursor.fetchall())
+                self.assertIn('order_status_created_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class KitchenEventTestCase(TestCase):
+    def test_order_events_reach_subscribers(self):
+        """Test order creation and status changes are pushed to the event bus"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        pending = OrderStatus.objects.create(name='pending')
+        processing = OrderStatus.objects.create(name='processing')
+
+        async def subscribe():
+            return get_event_bus().subscribe()
+
+        loop = asyncio.new_event_loop()
+        subscription = loop.run_until_complete(subscribe())
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                order = Order.objects.create(user=user, customer_name='Test Customer', status=pending)
+            event = loop.run_until_complete(subscription.get(timeout=1))
+            self.assertEqual(event['type'], 'order.created')
+            self.assertEqual(event['status'], 'pending')
+
+            order = Order.objects.get(pk=order.pk)
+            order.customer_name = 'Renamed'
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                order.save()
+            self.assertEqual(callbacks, [])
+
+            order.status = processing
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+            event = loop.run_until_complete(subscription.get(timeout=1))
+            self.assertEqual(event['type'], 'order.status_changed')
+            self.assertEqual(event['status'], 'processing')
+        finally:
+            subscription.close()
+            loop.close()
+
+
+class LookupRegistryTestCase(TestCase):
+    def test_statuses_are_served_from_memory_until_changed(self):
+        """Test status lookups hit the database once and follow edits"""
+        pending = OrderStatus.objects.create(name='pending')
+        self.assertEqual(get_order_status('pending'), pending)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_order_status('pending').pk, pending.pk)
+
+        pending.name = 'waiting'
+        pending.save()
+        self.assertEqual(get_order_status('waiting').pk, pending.pk)
+        with self.assertRaises(OrderStatus.DoesNotExist):
+            get_order_status('pending')
+
+
+class OrderIdGeneratorTestCase(TestCase):
+    def test_ids_are_unique_and_time_ordered(self):
+        """Test generated IDs are unique, sortable and need no queries once a node is leased"""
+        allocate_order_ids(1)
+        with self.assertNumQueries(0):
+            ids = allocate_order_ids(10000)
+
+        self.assertEqual(len(set(ids)), 10000)
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all(len(order_id) == 13 for order_id in ids))
+
+    def test_clock_going_backwards_keeps_ids_increasing(self):
+        """Test IDs keep increasing when the clock moves backwards"""
+        now = [1800000000.0]
+        generator = OrderIdGenerator(node=7, clock=lambda: now[0])
+
+        first = generator.next_id()
+        now[0] -= 5
+        second = generator.next_id()
+
+        self.assertLess(first, second)
+
+    def test_each_process_leases_its_own_node(self):
+        """Test workers sharing a clock get different nodes, and expired nodes are reused"""
+        now = [1800000000.0]
+        first, second = (OrderIdGenerator(clock=lambda: now[0]) for _ in range(2))
+        self.assertNotEqual(first.next_id(), second.next_id())
+        self.assertEqual(sorted(OrderIdNode.objects.values_list('node', flat=True)), [0, 1])
+
+        # a forked worker leases again instead of inheriting its parent's node
+        with mock.patch('orders.utility.os.getpid', return_value=-1):
+            self.assertEqual(first.node, 2)
+
+        OrderIdNode.objects.filter(node=0).update(expires_at=timezone.now())
+        third = OrderIdGenerator()
+        self.assertEqual(third.node, 0)
+        with self.assertNumQueries(0):
+            third.next_id()
+
+        # a lease taken in a transaction that rolls back is taken again
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            fourth = OrderIdGenerator()
+            node = fourth.node
+            raise RuntimeError
+        self.assertFalse(OrderIdNode.objects.filter(node=node).exists())
+        self.assertEqual(fourth.node, node)
+        self.assertTrue(OrderIdNode.objects.filter(node=node).exists())
+
+
+class CouponCampaignTestCase(TestCase):
+    def test_campaign_creates_unique_codes_in_chunks(self):
+        """Test a coupon campaign skips existing codes and reports progress"""
+        Coupon.objects.create(code='EXISTING01', discount_percentage='5.00',
+                              valid_from='2026-01-01', valid_until='2026-12-31')
+        progress = []
+
+        fresh_codes = iter(f'CODE{i:06d}' for i in range(3000))
+
+        def fake_codes(count, length, exclude):
+            # the first chunk collides with the existing coupon
+            codes = [next(fresh_codes) for _ in range(count)]
+            if not exclude:
+                codes[0] = 'EXISTING01'
+            return codes
+
+        with mock.patch('orders.services.generate_coupon_codes', side_effect=fake_codes):
+            codes = create_coupon_campaign(2500, '10.00', '2026-01-01', '2026-12-31',
+                                           chunk_size=1000, progress=lambda done, total: progress.append(done))
+
+        self.assertEqual(len(set(codes)), 2500)
+        self.assertNotIn('EXISTING01', codes)
+        self.assertEqual(Coupon.objects.count(), 2501)
+        self.assertEqual(progress, [999, 1999, 2500])
+
+    def test_api_campaigns_are_capped(self):
+        """Test the API creates small campaigns and sends large ones to the management command"""
+        admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.force_login(admin)
+        campaign = {'discount_percentage': '10.00', 'valid_from': '2026-01-01', 'valid_until': '2026-12-31'}
+
+        response = self.client.post('/api/orders/coupon/campaign/', {'count': 20, **campaign},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()['codes']), 20)
+
+        response = self.client.post('/api/orders/coupon/campaign/', {'count': 5001, **campaign},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('generate_coupons', response.json()['count'][0])
+        self.assertEqual(Coupon.objects.count(), 20)
+
+
+class DailySpecialTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = MenuCategory.objects.create(name='Main Course')
+        for i in range(5):
+            MenuItem.objects.create(name=f'Special {i}', category=category, price='10.00', is_featured=True)
+        MenuItem.objects.create(name='Regular', category=category, price='10.00')
+
+    def test_special_is_picked_once_per_day(self):
+        """Test the daily special is stable for a day and stored"""
+        day = date(2026, 3, 14)
+        special = get_daily_special(day)
+        self.assertTrue(special.is_featured)
+        self.assertEqual(DailySpecial.objects.get(date=day).menu_item, special)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_daily_special(day), special)
+
+    def test_rotation_keeps_special_for_the_period(self):
+        """Test a rotation period picks the same index for each day in it"""
+        start = date(2026, 3, 14).toordinal() // 7 * 7
+        picks = {daily_special_index(date.fromordinal(start + offset), 5, rotation_days=7) for offset in range(7)}
+        self.assertEqual(len(picks), 1)
+
+
+class NutritionTotalsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        OrderStatus.objects.create(name='pending')
+        category = MenuCategory.objects.create(name='Main Course')
+        self.chicken = MenuItem.objects.create(name='Grilled Chicken', category=category, price='250.00')
+        self.rice = MenuItem.objects.create(name='Rice', category=category, price='80.00')
+        self.water = MenuItem.objects.create(name='Water', category=category, price='20.00')
+        NutritionalInfo.objects.create(menu_item=self.chicken, calories=400, protein='40.00', carbs='5.00', fat='20.00')
+        NutritionalInfo.objects.create(menu_item=self.rice, calories=200, protein='4.00', carbs='45.00', fat='1.00')
+
+    def test_order_totals_use_constant_queries(self):
+        """Test nutrition totals for many orders come from one aggregate"""
+        self.client.force_authenticate(user=self.user)
+        orders = [
+            place_order(self.user, f'Customer {i}', {self.chicken.id: 1, self.rice.id: 2, self.water.id: 1})
+            for i in range(20)
+        ]
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/orders/nutrition/totals/',
+                                        {'order_ids': [order.id for order in orders]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['orders']), 20)
+        first = response.data['orders'][0]
+        self.assertEqual((first['calories'], first['protein'], first['missing_items']), (800, Decimal('48.00'), 1))
+        self.assertEqual(response.data['total']['calories'], 16000)
+
+    def test_cart_totals(self):
+        """Test nutrition totals for a cart of items"""
+        response = self.client.post('/api/orders/nutrition/totals/', {
+            'items': [{'menu_item': self.chicken.id, 'quantity': 2}, {'menu_item': self.water.id, 'quantity': 1}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total']['calories'], 800)
+        self.assertEqual(response.data['total']['fat'], Decimal('40.00'))
+        self.assertEqual(response.data['total']['missing_items'], 1)
+
+
+class StockLedgerTestCase(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', password='testpass123', is_staff=True)
+        self.client.login(username='manager', password='testpass123')
+        self.flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='20.00',
+                                                  unit='kg', minimum_threshold='5.00')
+
+    def post(self, **data):
+        return self.client.post(reverse('update_inventory', args=[self.flour.id]), data)
+
+    def test_updates_are_recorded_as_movements(self):
+        """Test stock changes are applied as deltas and kept in the ledger"""
+        self.post(kind='receipt', amount='10', note='Weekly delivery')
+        self.post(kind='waste', amount='1.5')
+        self.post(quantity='27')
+        self.post(kind='waste', amount='-3')
+        self.post(quantity='lots')
+
+        self.flour.refresh_from_db()
+        self.assertEqual(self.flour.quantity, Decimal('27.00'))
+        self.assertEqual(
+            list(self.flour.movements.order_by('id').values_list('kind', 'delta', 'created_by')),
+            [('receipt', Decimal('10.000'), self.manager.id),
+             ('waste', Decimal('-1.500'), self.manager.id),
+             ('adjustment', Decimal('-1.500'), self.manager.id)]
+        )
+
+    def test_compaction_keeps_level_and_totals(self):
+        """Test old movements fold into a snapshot of the level at the cutoff"""
+        self.post(kind='receipt', amount='10')
+        self.post(kind='usage', amount='4')
+        cutoff = timezone.now()
+        self.post(kind='receipt', amount='2')
+
+        self.assertEqual(compact_stock_ledger(cutoff), (1, 2))
+
+        snapshot = StockSnapshot.objects.get(inventory_item=self.flour)
+        self.assertEqual(snapshot.quantity, Decimal('26.00'))
+        self.assertEqual((snapshot.received, snapshot.used, snapshot.movement_count), (Decimal('10'), Decimal('4'), 2))
+        self.assertEqual(list(self.flour.movements.values_list('delta', flat=True)), [Decimal('2.000')])
+        self.assertEqual(compact_stock_ledger(cutoff), (0, 0))
+
+
+class LowStockAlertTestCase(TestCase):
+    def setUp(self):
+        self.flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='20.00',
+                                                  unit='kg', minimum_threshold='5.00')
+
+    def test_threshold_crossings_flag_items_and_alert(self):
+        """Test writes that cross the threshold flip the flag and publish one alert"""
+        async def subscribe():
+            return get_alert_bus().subscribe()
+
+        loop = asyncio.new_event_loop()
+        subscription = loop.run_until_complete(subscribe())
+        try:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                record_stock_movement(self.flour.id, 'usage', Decimal('10'))
+            self.assertEqual(callbacks, [])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                record_stock_movement(self.flour.id, 'usage', Decimal('6'))
+            event = loop.run_until_complete(subscription.get(timeout=1))
+            self.assertEqual((event['type'], event['name'], event['quantity']), ('inventory.low_stock', 'Flour', '4.000'))
+            self.assertEqual(list(InventoryItem.objects.filter(low_stock=True)), [self.flour])
+
+            flour = InventoryItem.objects.get(pk=self.flour.pk)
+            flour.quantity = Decimal('30.00')
+            with self.captureOnCommitCallbacks(execute=True):
+                flour.save()
+            event = loop.run_until_complete(subscription.get(timeout=1))
+            self.assertEqual(event['type'], 'inventory.restocked')
+            self.assertFalse(InventoryItem.objects.filter(low_stock=True).exists())
+        finally:
+            subscription.close()
+            loop.close()
+
+
+    def test_alerts_are_kept_until_acknowledged(self):
+        """Test alerts raised with nobody listening can be polled and acknowledged"""
+        User.objects.create_user(username='buyer', password='testpass123', is_staff=True)
+        self.client.login(username='buyer', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            record_stock_movement(self.flour.id, 'usage', Decimal('16'))
+
+        results = self.client.get(reverse('inventory_alerts')).json()['results']
+        self.assertEqual([(alert['type'], alert['name'], alert['quantity']) for alert in results],
+                         [('inventory.low_stock', 'Flour', '4.000')])
+
+        response = self.client.post(reverse('inventory_alerts'), {'ids': [results[0]['alert_id']]})
+        self.assertEqual(response.json(), {'acknowledged': 1})
+        self.assertEqual(self.client.get(reverse('inventory_alerts')).json()['results'], [])
+        self.assertIsNotNone(StockAlert.objects.get().acknowledged_by)
+
+    def test_stream_replays_stored_alerts_once(self):
+        """Test the alert stream sends stored alerts first and skips them when pushed again"""
+        def alert(alert_id):
+            return {'type': 'inventory.low_stock', 'alert_id': alert_id, 'name': 'Flour'}
+
+        async def catch_up():
+            return [alert(7)]
+
+        async def subscribe():
+            return get_alert_bus().subscribe()
+
+        loop = asyncio.new_event_loop()
+        subscription = loop.run_until_complete(subscribe())
+        stream = event_stream_response(subscription, catch_up, 'alert_id').streaming_content
+        try:
+            read = lambda: loop.run_until_complete(stream.__anext__())
+            self.assertEqual(read(), b"retry: 3000\n\n")
+            self.assertTrue(read().startswith(b"id: 7\nevent: inventory.low_stock\n"))
+
+            get_alert_bus().publish(alert(7))
+            get_alert_bus().publish(alert(8))
+            self.assertTrue(read().startswith(b"id: 8\n"))
+        finally:
+            subscription.close()
+            loop.close()
+
+
+@skipIf(np is None, "NumPy is not installed")
+class DemandForecastTestCase(TestCase):
+    def test_reorder_quantities_follow_recipe_demand(self):
+        """Test daily usage is forecast from recipes and topped up to the threshold"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        OrderStatus.objects.create(name='pending')
+        OrderStatus.objects.create(name='cancelled')
+        category = MenuCategory.objects.create(name='Bakery')
+        bread = MenuItem.objects.create(name='Bread', category=category, price='40.00')
+        flour = InventoryItem.objects.create(name='Flour', category='ingredients', quantity='10.00',
+                                             unit='kg', minimum_threshold='5.00')
+        InventoryItem.objects.create(name='Napkins', category='supplies', quantity='100.00',
+                                     unit='pieces', minimum_threshold='20.00')
+        RecipeComponent.objects.create(menu_item=bread, inventory_item=flour, quantity='0.500')
+
+        today = timezone.localdate()
+        for days_ago, portions, status_name in [(3, 2, 'pending'), (1, 4, 'pending'), (1, 10, 'cancelled')]:
+            order = place_order(user, 'Customer', {bread.id: portions}, status_name=status_name)
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        InventoryItem.objects.filter(pk=flour.pk).update(quantity='10.00')
+
+        suggestions = forecast_reorders(history_days=7, horizon_days=7, alpha=1, today=today)
+        self.assertEqual(
+            [(item['name'], item['daily_demand'], item['reorder_quantity']) for item in suggestions],
+            [('Flour', Decimal('2.000'), Decimal('9.00'))]
+        )
+
+        smoothed = forecast_reorders(history_days=7, horizon_days=7, alpha=0.5, today=today)
+        self.assertEqual(smoothed[0]['daily_demand'], Decimal('1.125'))
+
+
+class RatingSummaryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.completed = OrderStatus.objects.create(name='completed')
+
+    def review(self, rating, **kwargs):
+        order = Order.objects.create(user=self.user, customer_name='Reviewer', status=self.completed)
+        return CustomerReview.objects.create(order=order, customer=self.user, rating=rating, **kwargs)
+
+    def summary(self):
+        summary = get_rating_summary()
+        return summary.review_count, summary.rating_sum, summary.histogram
+
+    def test_summary_follows_review_writes(self):
+        """Test the summary row tracks inserts, approval, edits and deletes"""
+        five = self.review(5)
+        self.review(3)
+        pending = self.review(1, is_approved=False)
+        self.assertEqual(self.summary(), (2, 8, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}))
+
+        pending = CustomerReview.objects.get(pk=pending.pk)
+        pending.is_approved = True
+        pending.save()
+        five = CustomerReview.objects.get(pk=five.pk)
+        five.rating = 4
+        five.save()
+        self.assertEqual(self.summary(), (3, 8, {1: 1, 2: 0, 3: 1, 4: 1, 5: 0}))
+
+        CustomerReview.objects.get(pk=pending.pk).delete()
+        self.assertEqual(self.summary(), (2, 7, {1: 0, 2: 0, 3: 1, 4: 1, 5: 0}))
+        self.assertEqual(get_rating_summary().average_rating, 3.5)
+
+        expected = self.summary()
+        rebuild_rating_summary()
+        self.assertEqual(self.summary(), expected)
+
+    def test_reviews_page_is_two_reads(self):
+        """Test the summary and one page of reviews cost two queries"""
+        reviews = [self.review(4) for _ in range(5)]
+        self.review(2, is_approved=False)
+
+        with self.assertNumQueries(2):
+            summary = get_rating_summary()
+            page, cursor = approved_reviews_page(limit=3)
+            [review.customer.username for review in page]
+        self.assertEqual(summary.review_count, 5)
+        self.assertEqual(page, reviews[:1:-1])
+
+        page, cursor = approved_reviews_page(cursor, limit=3)
+        self.assertEqual(page, reviews[1::-1])
+        self.assertIsNone(cursor)
+
+    def test_stale_copies_do_not_double_count(self):
+        """Test each edit applies its delta from the stored rating, not the loaded one"""
+        review = self.review(5)
+        first, second = CustomerReview.objects.get(pk=review.pk), CustomerReview.objects.get(pk=review.pk)
+        first.rating = 4
+        first.save()
+        second.rating = 3
+        second.save()
+        self.assertEqual(self.summary(), (1, 3, {1: 0, 2: 0, 3: 1, 4: 0, 5: 0}))
+
+        first.is_approved = False
+        first.save()
+        second.delete()
+        self.assertEqual(self.summary(), (0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}))
+
+    def test_submitted_rating_must_be_one_to_five_stars(self):
+        """Test an out-of-range rating re-renders the form instead of failing"""
+        order = Order.objects.create(user=self.user, customer_name='Reviewer', status=self.completed)
+        self.client.login(username='testuser', password='testpass123')
+
+        for rating in ('7', '0', 'five', ''):
+            response = self.client.post(reverse('submit_review', args=[order.id]),
+                                        {'rating': rating, 'review_text': 'Lovely dosa'})
+            self.assertContains(response, 'Please choose a rating from 1 to 5 stars.')
+            self.assertContains(response, 'Lovely dosa')
+        self.assertFalse(CustomerReview.objects.exists())
+
+        response = self.client.post(reverse('submit_review', args=[order.id]), {'rating': '5'})
+        self.assertRedirects(response, reverse('my_orders'), fetch_redirect_response=False)
+        self.assertEqual(self.summary(), (1, 5, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}))
+
+    def test_reviews_page_links_to_older_reviews(self):
+        """Test the public reviews page renders a link to the next page"""
+        reviews = [self.review(4, review_text=f'Review {number}') for number in range(REVIEWS_PAGE_SIZE + 1)]
+
+        response = self.client.get(reverse('customer_reviews'))
+        self.assertEqual(list(response.context['reviews']), reviews[:0:-1])
+        self.assertContains(response, f"?cursor={response.context['next_cursor']}")
+        self.assertNotContains(response, 'Review 0<')
+
+        response = self.client.get(reverse('customer_reviews'), {'cursor': response.context['next_cursor']})
+        self.assertEqual(list(response.context['reviews']), reviews[:1])
+        self.assertContains(response, 'Review 0<')
+        self.assertNotContains(response, '?cursor=')
+
+
+@override_settings(REVIEW_FLAG_KEYWORDS=['refund', 'food poisoning'])
+class ReviewModerationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.completed = OrderStatus.objects.create(name='completed')
+
+    def review(self, rating, text='', **kwargs):
+        order = Order.objects.create(user=self.user, customer_name='Reviewer', status=self.completed)
+        return CustomerReview.objects.create(order=order, customer=self.user, rating=rating, review_text=text, **kwargs)
+
+    def test_keyword_matches_are_held_for_moderation(self):
+        """Test reviews containing a moderation keyword wait in the queue"""
+        flagged = self.review(1, 'I want a REFUND now')
+        self.assertEqual((flagged.is_flagged, flagged.is_approved), (True, False))
+        self.assertFalse(self.review(5, 'Refundable deposit, great food').is_flagged)
+        self.assertTrue(self.review(1, 'Got food poisoning.').is_flagged)
+        self.assertEqual(get_rating_summary().review_count, 1)
+
+    @override_settings(REVIEWS_REQUIRE_MODERATION=True)
+    def test_submitted_review_is_published_once_approved(self):
+        """Test a submitted review goes through the queue to the public page"""
+        order = Order.objects.create(user=self.user, customer_name='Reviewer', status=self.completed)
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('submit_review', args=[order.id]), {'rating': 4, 'review_text': 'Lovely dosa'})
+        review = CustomerReview.objects.get(order=order)
+        self.assertFalse(review.is_approved)
+        self.assertNotContains(self.client.get(reverse('customer_reviews')), 'Lovely dosa')
+
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(reverse('review_moderation'))
+        self.assertEqual([pending['id'] for pending in response.data['results']], [review.pk])
+        response = self.client.post(reverse('review_moderation'), {'approve': [review.pk]}, format='json')
+        self.assertEqual(response.data, {'approved': 1, 'rejected': 0})
+
+        self.assertEqual(self.client.get(reverse('review_moderation')).data['results'], [])
+        self.assertContains(self.client.get(reverse('customer_reviews')), 'Lovely dosa')
+        summary = get_rating_summary()
+        self.assertEqual((summary.review_count, summary.rating_sum), (1, 4))
+
+    def test_bulk_moderation_updates_summary_in_one_request(self):
+        """Test hundreds of reviews are moderated with a fixed number of queries"""
+        pending = [self.review(4, is_approved=False) for _ in range(200)]
+        approved = self.review(5)
+        self.client.login(username='admin', password='testpass123')
+
+        response = self.client.get('/api/orders/reviews/moderation/', {'limit': 150})
+        self.assertEqual(len(response.data['results']), 150)
+        response = self.client.get('/api/orders/reviews/moderation/', {'cursor': response.data['next_cursor']})
+        self.assertEqual([review['id'] for review in response.data['results']], [review.pk for review in pending[150:]])
+
+        payload = {'approve': [review.pk for review in pending[:150]],
+                   'reject': [review.pk for review in pending[150:]] + [approved.pk]}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/orders/reviews/moderation/', payload, format='json')
+        self.assertEqual(response.data, {'approved': 150, 'rejected': 51})
+        self.assertLessEqual(len([q for q in ctx.captured_queries if 'customerreview' in q['sql'].lower()]), 2)
+
+        summary = get_rating_summary()
+        self.assertEqual((summary.review_count, summary.rating_sum), (150, 600))
+        self.assertFalse(CustomerReview.objects.filter(is_approved=False, is_rejected=False).exists())
+
+        response = self.client.post('/api/orders/reviews/moderation/', {'approve': [1], 'reject': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/orders/reviews/moderation/',
+                                    {'approve': list(range(800)), 'reject': list(range(800, 1600))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/api/orders/reviews/moderation/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
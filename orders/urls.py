@@ -7,17 +7,23 @@ from .views import (
     LoyaltyProgramViewSet,
     NutritionalInfoViewSet,
     IngredientListView,
+    NutritionTotalsView,
     ContactViewSet,
+    TopSellersView,
+    ReviewModerationView,
     cancel_order,
     complete_order,
     edit_order,
     delete_order,
     invoice_page,
     kitchen_orders,
+    kitchen_order_stream,
     update_order_status,
     submit_review,
     customer_reviews,
     inventory_management,
+    inventory_alert_stream,
+    inventory_alerts,
     update_inventory
 )
 
@@ -32,9 +38,15 @@ router.register('contact', ContactViewSet, basename='contact')
 urlpatterns = [
     path('', include(router.urls)),
 
+    # Nutrition totals for orders or a cart
+    path("nutrition/totals/", NutritionTotalsView.as_view(), name="nutrition_totals"),
+
     # Ingredients API
     path("ingredients/", IngredientListView.as_view(), name="ingredients"),
 
+    # Reports
+    path("top-sellers/", TopSellersView.as_view(), name="top_sellers"),
+
     # Order management URLs
     path("order/<int:order_id>/cancel/", cancel_order, name="cancel_order"),
     path("order/<int:order_id>/complete/", complete_order, name="complete_order"),
@@ -44,13 +56,17 @@ urlpatterns = [
 
     # Kitchen and staff features
     path("kitchen/", kitchen_orders, name="kitchen_orders"),
+    path("kitchen/stream/", kitchen_order_stream, name="kitchen_order_stream"),
     path("order/<int:order_id>/status/<str:new_status>/", update_order_status, name="update_order_status"),
 
     # Customer reviews
     path("order/<int:order_id>/review/", submit_review, name="submit_review"),
     path("reviews/", customer_reviews, name="customer_reviews"),
+    path("reviews/moderation/", ReviewModerationView.as_view(), name="review_moderation"),
 
     # Inventory management
     path("inventory/", inventory_management, name="inventory_management"),
+    path("inventory/alerts/", inventory_alerts, name="inventory_alerts"),
+    path("inventory/alerts/stream/", inventory_alert_stream, name="inventory_alert_stream"),
     path("inventory/<int:item_id>/update/", update_inventory, name="update_inventory"),
 ]
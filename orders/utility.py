@@ -1,12 +1,19 @@
+import hashlib
+import os
+import socket
 import string
 import secrets
-from django.db.models import Sum
+import threading
+import time
+from datetime import timedelta
 from decimal import Decimal
 import logging
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.validators import validate_email
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
 from smtplib import SMTPException
 
 logger = logging.getLogger(__name__)
@@ -31,19 +38,208 @@ def send_email(recipient_email, subject, message):
         logger.error(f"Email error :{str(e)}")
         return False
 
-def generate_unique_order_id(length=8):
+# Crockford base32: no I, L, O or U, so IDs are easy to read out loud
+CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+# 2024-01-01T00:00:00Z in milliseconds
+ORDER_ID_EPOCH_MS = 1704067200000
+
+
+def encode_crockford(number, length):
     """
-    Generate a unique, short alphanumeric order ID.
-    Example: X9K2A7PZ
+    Encode a non-negative integer as a zero-padded Crockford base32 string.
     """
-    from .models import Order
-    characters = string.ascii_uppercase + string.digits
+    chars = []
+    for _ in range(length):
+        number, remainder = divmod(number, 32)
+        chars.append(CROCKFORD_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+# a worker holds its order ID node for this long and renews it halfway through
+ORDER_ID_NODE_LEASE = timedelta(minutes=10)
+
+
+def lease_order_id_node(holder, node=None):
+    """
+    Lease an order ID node to ``holder`` for ORDER_ID_NODE_LEASE: renew
+    ``node`` if ``holder`` still holds it, else take over an expired node,
+    else add a new one. Conditional UPDATEs and the primary key decide
+    races between workers.
+
+    :return: (node, expires_at).
+    :raises ImproperlyConfigured: if every node is leased.
+    """
+    from .models import OrderIdNode
+
+    now = timezone.now()
+    expires_at = now + ORDER_ID_NODE_LEASE
+    if node is not None and OrderIdNode.objects.filter(
+        node=node, holder=holder, expires_at__gt=now
+    ).update(expires_at=expires_at):
+        return node, expires_at
 
     while True:
-        order_id = ''.join(secrets.choice(characters) for _ in range(length))
-        if not Order.objects.filter(order_id=order_id).exists():
-            return order_id
-            
+        expired = OrderIdNode.objects.filter(expires_at__lte=now).values_list('node', flat=True).first()
+        if expired is not None:
+            if OrderIdNode.objects.filter(node=expired, expires_at__lte=now).update(
+                holder=holder, expires_at=expires_at
+            ):
+                return expired, expires_at
+            continue
+
+        used = set(OrderIdNode.objects.values_list('node', flat=True))
+        free = next((number for number in range(OrderIdGenerator.MAX_NODE + 1) if number not in used), None)
+        if free is None:
+            raise ImproperlyConfigured(
+                f"All {OrderIdGenerator.MAX_NODE + 1} order ID nodes are leased; too many worker processes."
+            )
+        try:
+            with transaction.atomic():
+                OrderIdNode.objects.create(node=free, holder=holder, expires_at=expires_at)
+            return free, expires_at
+        except IntegrityError:
+            continue
+
+
+class NodeLease:
+    """
+    A node leased by this process. A lease taken inside a transaction only
+    counts once that commits: if it rolls back, so does the lease row (and
+    every ID generated under it), and the node is leased again.
+    """
+
+    def __init__(self, node, expires_at):
+        self.node = node
+        self.renew_at = expires_at - ORDER_ID_NODE_LEASE / 2
+        self.committed = False
+
+    def commit(self):
+        self.committed = True
+
+    def usable(self):
+        if timezone.now() >= self.renew_at:
+            return False
+        # still waiting for the transaction that took it
+        return self.committed or self.commit in (callback for _, callback, *_ in connection.run_on_commit)
+
+
+class OrderIdGenerator:
+    """
+    Time-ordered order ID generator.
+
+    Each ID packs a 42-bit millisecond timestamp, a 10-bit node number and a
+    12-bit per-millisecond sequence into 13 Crockford base32 characters.
+    IDs from one node are strictly increasing; IDs from different nodes are
+    unique because every worker process leases its own node from the
+    database (OrderIdNode) on first use after it starts or forks. The lease
+    is renewed every few minutes; other IDs need no queries.
+    """
+    TIMESTAMP_BITS = 42
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+    LENGTH = 13
+
+    MAX_NODE = (1 << NODE_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self, node=None, clock=time.time):
+        self._node = node
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pid = None
+        self._holder = None
+        self._lease = None
+        self._last_ms = -1
+        self._last_node = None
+        self._sequence = 0
+
+    @property
+    def node(self):
+        """
+        The fixed node, or this process's leased one (leased or renewed
+        here when needed, outside the generator lock).
+        """
+        if self._node is not None:
+            return self._node
+        with self._lock:
+            self._reset_after_fork()
+            lease, holder = self._lease, self._holder
+        if lease is not None and lease.usable():
+            return lease.node
+
+        lease = NodeLease(*lease_order_id_node(holder, lease.node if lease is not None else None))
+        transaction.on_commit(lease.commit)
+        with self._lock:
+            if self._holder == holder:
+                self._lease = lease
+        return lease.node
+
+    def _reset_after_fork(self):
+        # a forked worker must not continue its parent's sequence
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._holder = f"{socket.gethostname()}:{self._pid}:{secrets.token_hex(4)}"
+            self._lease = None
+            self._last_ms = -1
+            self._sequence = 0
+
+    def allocate(self, count):
+        """
+        Return ``count`` new, strictly increasing order IDs.
+        """
+        ids = []
+        node = self.node
+        with self._lock:
+            self._reset_after_fork()
+            now_ms = int(self._clock() * 1000) - ORDER_ID_EPOCH_MS
+
+            # never move backwards, even if the system clock does
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif node != self._last_node:
+                # a new lease may be a lower node: start a new millisecond to stay increasing
+                self._last_ms += 1
+                self._sequence = 0
+            self._last_node = node
+
+            for _ in range(count):
+                if self._sequence > self.MAX_SEQUENCE:
+                    # sequence exhausted: borrow the next millisecond
+                    self._last_ms += 1
+                    self._sequence = 0
+                value = (
+                    (self._last_ms << (self.NODE_BITS + self.SEQUENCE_BITS))
+                    | (node << self.SEQUENCE_BITS)
+                    | self._sequence
+                )
+                ids.append(encode_crockford(value, self.LENGTH))
+                self._sequence += 1
+        return ids
+
+    def next_id(self):
+        return self.allocate(1)[0]
+
+
+_order_id_generator = OrderIdGenerator()
+
+
+def generate_unique_order_id():
+    """
+    Generate a unique, time-ordered order ID without a per-ID database lookup.
+    Example: 0A8MKF2ZP2000
+    """
+    return _order_id_generator.next_id()
+
+
+def allocate_order_ids(count):
+    """
+    Reserve ``count`` unique order IDs at once, e.g. for bulk imports
+    that create orders with bulk_create().
+    """
+    return _order_id_generator.allocate(count)
+
 def send_order_confirmation_email(order_id, customer_email, customer_name, total_price):
     """
     Sends an order confirmation email to the customer.
@@ -98,27 +294,54 @@ def send_order_confirmation_email(order_id, customer_email, customer_name, total
         }
                             
 
+def random_coupon_code(length=10):
+    """ Returns a random alphanumeric code (no uniqueness check)."""
+    characters = string.ascii_uppercase + string.digits
+    return ''.join(secrets.choice(characters) for _ in range(length))
+
+
 def generate_coupon_code(length=10):
     """ Generates a unique random alphanumeric coupon code."""
     from .models import Coupon
-    characters = string.ascii_uppercase + string.digits
     while True:
-        code = ''.join(secrets.choice(characters) for _ in range(length))
+        code = random_coupon_code(length)
         #  check if this code already exists in database
         if not Coupon.objects.filter(code=code).exists():
             return code
 
+
+def generate_coupon_codes(count, length=10, exclude=()):
+    """
+    Generate ``count`` distinct random coupon codes in memory.
+    Codes found in ``exclude`` are never returned.
+    """
+    characters = (string.ascii_uppercase + string.digits).encode()
+    # map byte values onto the 36 characters; the 4 values above 251 are
+    # dropped so every character stays equally likely
+    usable = 256 - 256 % len(characters)
+    table = bytes(characters[b % len(characters)] for b in range(usable)) + bytes(256 - usable)
+    dropped = bytes(range(usable, 256))
+
+    exclude = set(exclude)
+    codes = set()
+    while len(codes) < count:
+        missing = count - len(codes)
+        chars = secrets.token_bytes(missing * length + 64).translate(table, dropped).decode()
+        for start in range(0, len(chars) - length + 1, length):
+            code = chars[start:start + length]
+            if code not in exclude:
+                codes.add(code)
+    return list(codes)[:count]
+
 def get_daily_sales_total(date):
     """
     Return the total sales for a given date.
     :param date: A python date object.
-    :return : Decimal total of sales for that day , or 0 if none.
+    :return : Decimal total of completed sales for that day , or 0 if none.
     """
-    from .models import Order
-     # orders QuerySet
-    orders = Order.objects.filter(created_at__date=date)
-    result = orders.aggregate(total_sum=Sum('total_price'))
-    total = result.get('total_sum')
+    from .models import DailySalesRollup
+    # one indexed lookup on the precomputed daily rollup
+    total = DailySalesRollup.objects.filter(date=date).values_list('gross_revenue', flat=True).first()
 
     if total is None:
         return Decimal("0.00")
@@ -170,16 +393,59 @@ def get_todays_restaurant_hours():
     return "9:00 AM - 10:00 PM"
 
 
-def get_random_daily_special():
+_daily_special_cache = {}
+
+
+def daily_special_index(day, choices, rotation_days=1):
+    """
+    Deterministic index into ``choices`` items for ``day``: every worker
+    computes the same pick, and it only changes every ``rotation_days``.
+    """
+    period = day.toordinal() // max(rotation_days, 1)
+    digest = hashlib.sha256(f"daily-special:{period}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % choices
+
+
+def get_daily_special(day=None):
     """
-    Get a random daily special from featured menu items.
+    Return the special (a featured MenuItem) for a business day, or None.
+
+    The pick is stored in DailySpecial the first time it is needed, so later
+    calls are an in-memory hit or a single lookup on the unique date.
     """
+    from django.utils import timezone
+    from home.menu_cache import menu_snapshots
     from home.models import MenuItem
-    featured_items = MenuItem.objects.filter(is_featured=True)
-    if featured_items.exists():
-        import random
-        return random.choice(list(featured_items))
-    return None
+    from .models import DailySpecial
+
+    day = day or timezone.localdate()
+    # menu edits (e.g. deleting the special) change the menu version
+    key = (day, menu_snapshots.version())
+    if key in _daily_special_cache:
+        return _daily_special_cache[key]
+
+    special = DailySpecial.objects.select_related('menu_item').filter(date=day).first()
+    if special is None:
+        featured_ids = list(MenuItem.objects.filter(is_featured=True).order_by('id').values_list('id', flat=True))
+        if not featured_ids:
+            return None
+        rotation_days = getattr(settings, 'DAILY_SPECIAL_ROTATION_DAYS', 1)
+        menu_item_id = featured_ids[daily_special_index(day, len(featured_ids), rotation_days)]
+        # unique date: concurrent workers all end up with the same row
+        special, _ = DailySpecial.objects.get_or_create(date=day, defaults={'menu_item_id': menu_item_id})
+        special = DailySpecial.objects.select_related('menu_item').get(pk=special.pk)
+
+    _daily_special_cache.clear()
+    _daily_special_cache[key] = special.menu_item
+    return special.menu_item
+
+
+def get_random_daily_special():
+    """
+    Get today's daily special from featured menu items.
+    Kept for existing callers, see get_daily_special().
+    """
+    return get_daily_special()
 
 
 def validate_email_address(email):
@@ -193,16 +459,14 @@ def validate_email_address(email):
         return False
 
 
-def top_selling_menu_items(limit=5):
+def top_selling_menu_items(limit=5, window='30d', metric='quantity'):
     """
-    Custom manager method to get top-selling menu items.
+    Top-selling menu items, ranked by quantity sold (or revenue) over a window.
+    Served from the cached leaderboards in orders.reports.
     """
-    from django.db.models import Count
-    from .models import OrderItem
+    from .reports import get_top_sellers
 
-    return OrderItem.objects.values('menu_item__name') \
-        .annotate(order_count=Count('menu_item')) \
-        .order_by('-order_count')[:limit]
+    return get_top_sellers(window, metric, limit)
 
 
 def upcoming_daily_specials():
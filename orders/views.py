@@ -1,12 +1,31 @@
+import asyncio
+import json
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from .models import Order, OrderItem, Coupon, PaymentMethod, LoyaltyProgram, NutritionalInfo, Ingredient, Contact, CustomerReview, InventoryItem
-from django.db import models
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from .models import Order, OrderItem, OrderStatus, Coupon, PaymentMethod, LoyaltyProgram, NutritionalInfo, Ingredient, Contact, CustomerReview, InventoryItem
+from django.conf import settings
+from django.db import models, transaction
 from home.models import MenuItem
-from .serializers import OrderSerializer, CouponSerializer, PaymentMethodSerializer, LoyaltyProgramSerializer, NutritionalInfoSerializer, IngredientSerializer, ContactSerializer
+from .events import get_alert_bus, get_event_bus
+from .inventory import acknowledge_alerts, record_stock_movement, set_stock_level, unacknowledged_alerts
+from .registry import get_order_status
+from .reports import TOP_SELLER_SIZE, get_top_sellers
+from .reviews import approved_reviews_page, get_rating_summary, moderate_reviews, pending_reviews_page
+from .services import create_coupon_campaign, get_kitchen_board, nutrition_totals_for_cart, nutrition_totals_for_orders
+from .serializers import OrderSerializer, CouponSerializer, CouponCampaignSerializer, PaymentMethodSerializer, LoyaltyProgramSerializer, NutritionalInfoSerializer, NutritionTotalsSerializer, IngredientSerializer, ContactSerializer
+from .serializers import PendingReviewSerializer, ReviewModerationSerializer
 
 # ----------------------------------------------------
 # API ViewSet
@@ -16,10 +35,18 @@ class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
 
     def get_queryset(self):
+        # status, items and their menu items are loaded in a fixed number of queries
+        queryset = Order.objects.select_related('status').prefetch_related(
+            models.Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('menu_item').order_by('id'))
+        ).order_by('-created_at')
+
         # Filter orders by user if not staff
         if not self.request.user.is_staff:
-            return Order.objects.filter(user=self.request.user).order_by('-created_at')
-        return Order.objects.all().order_by('-created_at')
+            return queryset.filter(user=self.request.user)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
 
     @action(detail=False, methods=['get'])
     def history(self, request):
@@ -48,9 +75,8 @@ class OrderViewSet(viewsets.ModelViewSet):
 # ----------------------------------------------------
 @login_required
 def cancel_order(request, order_id):
-    from .models import OrderStatus
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    cancelled_status = OrderStatus.objects.get(name='cancelled')
+    cancelled_status = get_order_status('cancelled')
     order.status = cancelled_status
     order.save()
     return redirect('my_orders')
@@ -61,12 +87,11 @@ def cancel_order(request, order_id):
 # ----------------------------------------------------
 @login_required
 def complete_order(request, order_id):
-    from .models import OrderStatus
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(Order.objects.select_related('status'), id=order_id, user=request.user)
 
     # only pending orders can be completed
     if order.status and order.status.name == "pending":
-        completed_status = OrderStatus.objects.get(name='completed')
+        completed_status = get_order_status('completed')
         order.status = completed_status
         order.save()
 
@@ -96,20 +121,22 @@ def edit_order(request, order_id):
         # Update name
         order.customer_name = request.POST.get("customer_name")
 
-        # Remove old items
-        order.orderitem_set.all().delete()
+        # lines and the stock they take change together
+        with transaction.atomic():
+            # Remove old items
+            order.orderitem_set.all().delete()
 
-        for item in items:
-            qty = int(request.POST.get(f"qty_{item.id}", 0))
-            if qty > 0:
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=item,
-                    quantity=qty,
-                    price=item.price
-                )
+            for item in items:
+                qty = int(request.POST.get(f"qty_{item.id}", 0))
+                if qty > 0:
+                    OrderItem.objects.create(
+                        order=order,
+                        menu_item=item,
+                        quantity=qty,
+                        price=item.price
+                    )
 
-        order.save()
+            order.save()
 
         return redirect("my_orders")
 
@@ -138,6 +165,36 @@ class CouponViewSet(viewsets.ModelViewSet):
         # Add validation logic here
         return Response({"valid": coupon.is_active, "discount": coupon.discount_percentage})
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def campaign(self, request):
+        """
+        Bulk-create a campaign of coupons with unique codes.
+        """
+        serializer = CouponCampaignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        codes = create_coupon_campaign(**serializer.validated_data)
+        return Response({"created": len(codes), "codes": codes}, status=status.HTTP_201_CREATED)
+
+
+# ----------------------------------------------------
+# TOP SELLERS
+# ----------------------------------------------------
+class TopSellersView(APIView):
+    """
+    Best-selling menu items over today, 7d or 30d, by quantity or revenue.
+    """
+
+    def get(self, request):
+        window = request.query_params.get('window', '7d')
+        metric = request.query_params.get('by', 'quantity')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), TOP_SELLER_SIZE)
+            results = get_top_sellers(window, metric, limit)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"window": window, "by": metric, "results": results})
+
 
 # ----------------------------------------------------
 # PAYMENT METHOD VIEWS
@@ -163,17 +220,53 @@ class NutritionalInfoViewSet(viewsets.ModelViewSet):
     serializer_class = NutritionalInfoSerializer
 
 
+class NutritionTotalsView(APIView):
+    """
+    Calories and macros for one or more orders, or for a cart of items.
+    """
+
+    def post(self, request):
+        serializer = NutritionTotalsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if serializer.validated_data.get('items'):
+            quantities = {}
+            for line in serializer.validated_data['items']:
+                quantities[line['menu_item']] = quantities.get(line['menu_item'], 0) + line['quantity']
+            return Response({"total": nutrition_totals_for_cart(quantities)})
+
+        if not request.user.is_authenticated:
+            return Response({"detail": "Authentication required for order totals."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        per_order, total = nutrition_totals_for_orders(
+            serializer.validated_data['order_ids'],
+            user=None if request.user.is_staff else request.user
+        )
+        return Response({
+            "orders": [{"order": order_id, **totals} for order_id, totals in per_order.items()],
+            "total": total,
+        })
+
+
 # ----------------------------------------------------
 # INGREDIENT VIEWS
 # ----------------------------------------------------
+class IngredientPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class IngredientListView(generics.ListAPIView):
     serializer_class = IngredientSerializer
+    pagination_class = IngredientPagination
 
     def get_queryset(self):
         menu_item_id = self.request.query_params.get('menu_item', None)
         if menu_item_id:
-            return Ingredient.objects.filter(menu_item_id=menu_item_id)
-        return Ingredient.objects.all()
+            return Ingredient.objects.filter(menu_item_id=menu_item_id).order_by('id')
+        return Ingredient.objects.all().order_by('id')
 
 
 # ----------------------------------------------------
@@ -200,20 +293,79 @@ def kitchen_orders(request):
         messages.error(request, "You don't have permission to access kitchen orders.")
         return redirect('home')
 
-    # Get orders that need kitchen attention
-    kitchen_orders = Order.objects.filter(
-        status__name__in=['pending', 'processing']
-    ).order_by('created_at')
+    # Get one page of orders that need kitchen attention
+    try:
+        board = get_kitchen_board(request.GET.get('cursor'))
+    except ValueError:
+        return redirect('kitchen_orders')
 
     context = {
-        'kitchen_orders': kitchen_orders,
-        'pending_count': kitchen_orders.filter(status__name='pending').count(),
-        'processing_count': kitchen_orders.filter(status__name='processing').count(),
+        'kitchen_orders': board['orders'],
+        'next_cursor': board['next_cursor'],
+        'pending_count': board['pending_count'],
+        'processing_count': board['processing_count'],
     }
 
     return render(request, 'kitchen_orders.html', context)
 
 
+# ----------------------------------------------------
+# KITCHEN ORDER STREAM (server-sent events)
+# ----------------------------------------------------
+EVENT_STREAM_KEEPALIVE = 15  # seconds between keep-alive comments
+
+
+async def kitchen_order_stream(request):
+    """
+    Push order created / status changed events to kitchen displays.
+    Needs an ASGI server; idle connections cost no database queries.
+    """
+    user = await request.auser()
+    is_kitchen_user = user.is_authenticated and (
+        user.is_staff or await sync_to_async(hasattr)(user, 'staff')
+    )
+    if not is_kitchen_user:
+        return HttpResponseForbidden("You don't have permission to access kitchen orders.")
+
+    return event_stream_response(get_event_bus().subscribe())
+
+
+def event_stream_response(subscription, catch_up=None, id_field=None):
+    """
+    Stream a bus subscription as server-sent events, closing it when the
+    client goes away.
+
+    ``catch_up`` is an optional coroutine function returning stored events
+    (each with an ``id_field``). It runs on connect and on every keep-alive,
+    so events published while the client was away, or by another process,
+    still arrive; events already sent on this connection are skipped.
+    """
+    async def event_stream():
+        sent = set()
+        try:
+            yield "retry: 3000\n\n"
+            pending = await catch_up() if catch_up else []
+            while True:
+                for event in pending:
+                    if id_field is None:
+                        yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                    elif event[id_field] not in sent:
+                        sent.add(event[id_field])
+                        yield f"id: {event[id_field]}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                try:
+                    pending = [await subscription.get(timeout=EVENT_STREAM_KEEPALIVE)]
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    pending = await catch_up() if catch_up else []
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ----------------------------------------------------
 # UPDATE ORDER STATUS (for kitchen staff)
 # ----------------------------------------------------
@@ -225,7 +377,10 @@ def update_order_status(request, order_id, new_status):
         return redirect('home')
 
     order = get_object_or_404(Order, id=order_id)
-    status_obj = get_object_or_404(OrderStatus, name=new_status)
+    try:
+        status_obj = get_order_status(new_status)
+    except OrderStatus.DoesNotExist:
+        raise Http404("No OrderStatus matches the given query.")
 
     order.status = status_obj
     order.save()
@@ -251,17 +406,31 @@ def submit_review(request, order_id):
         return redirect('my_orders')
 
     if request.method == "POST":
-        rating = request.POST.get('rating')
+        rating = request.POST.get('rating', '')
         review_text = request.POST.get('review_text', '')
 
-        CustomerReview.objects.create(
-            order=order,
-            customer=request.user,
-            rating=rating,
-            review_text=review_text
-        )
-
-        messages.success(request, "Thank you for your review!")
+        if rating not in {str(stars) for stars in range(1, 6)}:
+            return render(request, 'submit_review.html', {
+                'order': order,
+                'review_text': review_text,
+                'error': "Please choose a rating from 1 to 5 stars.",
+            })
+
+        # the review and the rating summary are written together
+        with transaction.atomic():
+            review = CustomerReview.objects.create(
+                order=order,
+                customer=request.user,
+                rating=int(rating),
+                review_text=review_text,
+                # held for the moderation queue when every review is checked first
+                is_approved=not settings.REVIEWS_REQUIRE_MODERATION
+            )
+
+        if review.is_approved:
+            messages.success(request, "Thank you for your review!")
+        else:
+            messages.success(request, "Thank you for your review! It will appear once it has been checked.")
         return redirect('my_orders')
 
     return render(request, 'submit_review.html', {'order': order})
@@ -271,20 +440,65 @@ def submit_review(request, order_id):
 # VIEW ALL REVIEWS (public)
 # ----------------------------------------------------
 def customer_reviews(request):
-    reviews = CustomerReview.objects.filter(is_approved=True).select_related('order', 'customer').order_by('-created_at')
-
-    # Calculate average rating
-    avg_rating = reviews.aggregate(avg=models.Avg('rating'))['avg__avg'] or 0
+    # the summary row is kept up to date on every review write
+    summary = get_rating_summary()
+    try:
+        reviews, next_cursor = approved_reviews_page(request.GET.get('cursor'))
+    except ValueError:
+        return redirect('customer_reviews')
 
     context = {
         'reviews': reviews,
-        'average_rating': round(avg_rating, 1),
-        'total_reviews': reviews.count(),
+        'next_cursor': next_cursor,
+        'average_rating': round(summary.average_rating, 1),
+        'total_reviews': summary.review_count,
+        'rating_histogram': summary.histogram,
     }
 
     return render(request, 'customer_reviews.html', context)
 
 
+# ----------------------------------------------------
+# REVIEW MODERATION QUEUE (staff API)
+# ----------------------------------------------------
+class ReviewModerationView(APIView):
+    """
+    GET: pending reviews, oldest first, one keyset page at a time
+    (?cursor=..., ?flagged=1 for keyword matches only).
+    POST: {"approve": [ids], "reject": [ids]} in one set-based update.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+            reviews, next_cursor = pending_reviews_page(
+                request.query_params.get('cursor'),
+                limit,
+                flagged_only=request.query_params.get('flagged') in ('1', 'true')
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": PendingReviewSerializer(reviews, many=True).data,
+            "next_cursor": next_cursor,
+        })
+
+    def post(self, request):
+        serializer = ReviewModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            approved, rejected = moderate_reviews(
+                serializer.validated_data['approve'],
+                serializer.validated_data['reject']
+            )
+        except ValidationError as e:
+            return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"approved": approved, "rejected": rejected})
+
+
 # ----------------------------------------------------
 # INVENTORY MANAGEMENT
 # ----------------------------------------------------
@@ -295,19 +509,66 @@ def inventory_management(request):
         messages.error(request, "You don't have permission to access inventory.")
         return redirect('home')
 
-    inventory_items = InventoryItem.objects.all().order_by('category', 'name')
-    low_stock_items = inventory_items.filter(quantity__lte=models.F('minimum_threshold'))
+    inventory_items = list(InventoryItem.objects.all().order_by('category', 'name'))
+    # the flag is maintained on write, so this is an index lookup
+    low_stock_items = list(InventoryItem.objects.filter(low_stock=True).order_by('category', 'name'))
 
     context = {
         'inventory_items': inventory_items,
         'low_stock_items': low_stock_items,
-        'total_items': inventory_items.count(),
-        'low_stock_count': low_stock_items.count(),
+        'total_items': len(inventory_items),
+        'low_stock_count': len(low_stock_items),
     }
 
     return render(request, 'inventory_management.html', context)
 
 
+# ----------------------------------------------------
+# LOW-STOCK ALERTS (for purchasing)
+# ----------------------------------------------------
+async def inventory_alert_stream(request):
+    """
+    Push low-stock / restocked alerts as soon as a stock write crosses an
+    item's minimum threshold. Needs an ASGI server, like the kitchen stream.
+
+    Unacknowledged alerts are replayed on connect (after Last-Event-ID when
+    reconnecting) and re-read on every keep-alive, so alerts raised while
+    nobody listened, or by a WSGI worker, are not lost.
+    """
+    user = await request.auser()
+    is_staff_user = user.is_authenticated and (
+        user.is_staff or await sync_to_async(hasattr)(user, 'staff')
+    )
+    if not is_staff_user:
+        return HttpResponseForbidden("You don't have permission to access inventory.")
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    after = int(last_event_id) if last_event_id.isdigit() else None
+    return event_stream_response(
+        get_alert_bus().subscribe(),
+        catch_up=sync_to_async(lambda: unacknowledged_alerts(after)),
+        id_field='alert_id'
+    )
+
+
+@login_required
+def inventory_alerts(request):
+    """
+    GET: unacknowledged alerts, oldest first (?after=<alert id>), for
+    clients that poll instead of streaming.
+    POST: acknowledge alerts (ids=1&ids=2).
+    """
+    if not request.user.is_staff and not hasattr(request.user, 'staff'):
+        return HttpResponseForbidden("You don't have permission to access inventory.")
+
+    if request.method == "POST":
+        ids = [value for value in request.POST.getlist('ids') if value.isdigit()]
+        return JsonResponse({"acknowledged": acknowledge_alerts(ids, request.user)})
+
+    after = request.GET.get('after', '')
+    return JsonResponse({"results": unacknowledged_alerts(int(after) if after.isdigit() else None)})
+
+
 # ----------------------------------------------------
 # UPDATE INVENTORY ITEM
 # ----------------------------------------------------
@@ -321,11 +582,22 @@ def update_inventory(request, item_id):
     item = get_object_or_404(InventoryItem, id=item_id)
 
     if request.method == "POST":
-        new_quantity = request.POST.get('quantity')
-        if new_quantity:
-            item.quantity = float(new_quantity)
-            item.save()
-            messages.success(request, f"{item.name} quantity updated to {item.quantity} {item.unit}.")
+        # either a ledger entry (kind + amount) or a counted quantity
+        kind = request.POST.get('kind')
+        value = request.POST.get('amount' if kind else 'quantity')
+        note = request.POST.get('note', '')[:200]
+        if value:
+            try:
+                value = Decimal(value)
+                if kind:
+                    record_stock_movement(item.pk, kind, value, user=request.user, note=note)
+                else:
+                    set_stock_level(item.pk, value, user=request.user, note=note)
+            except (InvalidOperation, ValidationError):
+                messages.error(request, "Please enter a valid quantity.")
+            else:
+                item.refresh_from_db(fields=['quantity'])
+                messages.success(request, f"{item.name} quantity updated to {item.quantity} {item.unit}.")
         return redirect('inventory_management')
 
     return render(request, 'update_inventory.html', {'item': item})
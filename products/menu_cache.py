@@ -0,0 +1,10 @@
+from home.menu_cache import VersionedSnapshotCache
+
+
+def load_products():
+    from .models import MenuItem
+
+    return {'items': list(MenuItem.objects.order_by('item_name'))}
+
+
+product_snapshots = VersionedSnapshotCache('products:menu', load_products)
@@ -1,7 +1,13 @@
 from rest_framework import viewsets
+from home.menu_cache import CachedMenuListMixin
+from .menu_cache import product_snapshots
 from .models import MenuItem
 from .serializers import MenuItemSerializer
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(CachedMenuListMixin, viewsets.ModelViewSet):
     queryset = MenuItem.objects.all().order_by('item_name')
     serializer_class = MenuItemSerializer
+    menu_cache = product_snapshots
+
+    def get_menu_data(self, snapshot):
+        return self.get_serializer(snapshot.items, many=True).data
@@ -153,3 +153,11 @@ EMAIL_HOST_USER = 'your_email@gmail.com'
 EMAIL_HOST_PASSWORD = 'your_app_password'
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Review moderation: with REVIEWS_REQUIRE_MODERATION every submitted review
+# waits in the staff queue until approved; otherwise only reviews containing
+# one of REVIEW_FLAG_KEYWORDS (whole words, any case) are held.
+REVIEWS_REQUIRE_MODERATION = os.environ.get('REVIEWS_REQUIRE_MODERATION', '').lower() in ('1', 'true', 'yes')
+REVIEW_FLAG_KEYWORDS = [
+    'refund', 'food poisoning', 'sick', 'vomit', 'hair', 'cockroach', 'insect', 'rat', 'scam', 'fraud',
+]